@@ -1,10 +1,22 @@
+import uuid
+
 import dash
 from dash import Dash, html, dcc
 import dash_bootstrap_components as dbc
 
+from utils.background import BACKGROUND_MANAGER
+from utils.export import export_bp
+from utils.http_cache import init_http_cache
+from utils.rapport import rapport_bp
+
 # On utilise un thème BOOTSTRAP pour que ce soit joli tout de suite
-app = Dash(__name__, use_pages=True, external_stylesheets=[dbc.themes.BOOTSTRAP])
+# Les callbacks lourds (pages 1 et 2) tournent en arrière-plan si diskcache est installé
+app = Dash(__name__, use_pages=True, external_stylesheets=[dbc.themes.BOOTSTRAP],
+           background_callback_manager=BACKGROUND_MANAGER)
 server = app.server  # Cette ligne est CRUCIALE pour le déploiement
+server.register_blueprint(export_bp)  # Export CSV / Parquet des indicateurs (/export/indicateurs)
+server.register_blueprint(rapport_bp)  # Rapports Mode Élu en lot (/rapports/generer)
+init_http_cache(server)  # Compression gzip/brotli + ETag, données immuables sous /data/
 
 # --- LE STYLE CSS (Pour placer la sidebar à gauche) ---
 SIDEBAR_STYLE = {
@@ -48,10 +60,16 @@ sidebar = html.Div(
 )
 
 # --- L'ORGANISATION GÉNÉRALE ---
-app.layout = html.Div([
-    sidebar,
-    html.Div(dash.page_container, style=CONTENT_STYLE)
-])
+# Layout en fonction : chaque chargement de page reçoit un identifiant de session,
+# utilisé pour abandonner les calculs dépassés par une requête plus récente
+def serve_layout():
+    return html.Div([
+        dcc.Store(id="session-id", data=uuid.uuid4().hex),
+        sidebar,
+        html.Div(dash.page_container, style=CONTENT_STYLE)
+    ])
+
+app.layout = serve_layout
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -1,5 +1,6 @@
 import dash
 from dash import dcc, html, Input, Output, ctx, State
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
 import plotly.express as px
 import plotly.graph_objects as go
@@ -8,6 +9,16 @@ import numpy as np
 
 # Import du Data Loader
 from utils.data_loader import load_all_data
+from utils.background import background_callback
+from utils.coalescing import GATE
+from utils.episodes import detect_episodes
+from utils.extremes import city_return_level
+from utils.indicators import elu_summary
+from utils.extraction import city_entry, extract_region_data
+from utils.anomalies import city_stats, region_stats
+from utils.trends import trend_table
+from utils.regions import TOUTES_REGIONS
+from utils.pyramid import LEVEL_NAMES, ZOOM_CLIENTSIDE, city_pyramid, region_pyramid, relayout_range, select_level, zoom_width
 
 dash.register_page(__name__, path='/climat', name='1. Climat Local')
 
@@ -25,6 +36,8 @@ liste_regions.insert(0, "Toutes les regions")
 # Récupération des années depuis le Dataset météo
 liste_annees = sorted(list(set(pd.to_datetime(ds.time.values).year)))
 premiere_annee_dispo = liste_annees[0]
+derniere_annee_dispo = liste_annees[-1]
+marks_annees = {a: str(a) for a in liste_annees if a % 25 == 0}
 
 THEME_COLOR = "#64748B"
 
@@ -69,6 +82,16 @@ layout = dbc.Container([
 
                     html.Label("5. Annee Zoom :", className="fw-bold"),
                     dcc.Dropdown(id='dd-annee', options=[{'label': str(a), 'value': a} for a in liste_annees], value=2003, clearable=False, className="mb-3"),
+
+                    html.Hr(),
+
+                    # Périodes : anomalies (stripes, heatmap) et réchauffement (période B vs A)
+                    html.Label("6. Periode de reference :", className="fw-bold"),
+                    dcc.RangeSlider(id='slider-reference', min=premiere_annee_dispo, max=derniere_annee_dispo, step=1, value=[1950, 1980], marks=marks_annees, tooltip={"placement": "bottom"}),
+                    html.Label("7. Periode A (avant) :", className="fw-bold mt-3"),
+                    dcc.RangeSlider(id='slider-periode-a', min=premiere_annee_dispo, max=derniere_annee_dispo, step=1, value=[premiere_annee_dispo, premiere_annee_dispo + 4], marks=marks_annees, tooltip={"placement": "bottom"}),
+                    html.Label("8. Periode B (apres) :", className="fw-bold mt-3"),
+                    dcc.RangeSlider(id='slider-periode-b', min=premiere_annee_dispo, max=derniere_annee_dispo, step=1, value=[derniere_annee_dispo - 4, derniere_annee_dispo], marks=marks_annees, tooltip={"placement": "bottom"}),
                 ])
             ], className="shadow sticky-top", style={"top": "20px"})
         ], id="col-sidebar", width=12, lg=3),
@@ -78,10 +101,17 @@ layout = dbc.Container([
             # KPIs
             dbc.Row([
                 dbc.Col(dbc.Card(dbc.CardBody([html.H6("Moyenne Annuelle", className="text-muted small fw-bold"), html.H2(id="kpi-mean", className="text-primary fw-bold")])), width=12, md=4),
-                dbc.Col(dbc.Card(dbc.CardBody([html.H6("Record Absolu", className="text-muted small fw-bold"), html.H2(id="kpi-max", className="text-danger fw-bold"), html.Small(id="kpi-max-date", className="text-muted")])), width=12, md=4),
-                dbc.Col(dbc.Card(dbc.CardBody([html.H6("Rechauffement (+75 ans)", className="text-muted small fw-bold"), html.H2(id="kpi-delta", className="text-warning fw-bold"), html.Small("Difference 2020-25 vs 1950-55", className="text-muted small")])), width=12, md=4),
+                dbc.Col(dbc.Card(dbc.CardBody([html.H6("Record Absolu", className="text-muted small fw-bold"), html.H2(id="kpi-max", className="text-danger fw-bold"), html.Small(id="kpi-max-date", className="text-muted"), html.Small(id="kpi-retour", className="d-block text-muted small")])), width=12, md=4),
+                dbc.Col(dbc.Card(dbc.CardBody([html.H6("Rechauffement (Periode B vs A)", className="text-muted small fw-bold"), html.H2(id="kpi-delta", className="text-warning fw-bold"), html.Small(id="kpi-delta-label", className="text-muted small"), html.Small(id="kpi-trend", className="d-block text-muted small")])), width=12, md=4),
             ], className="mb-3"),
 
+            # Progression du calcul (visible uniquement pendant un calcul en arrière-plan)
+            dbc.Progress(id="progress-calcul", value=0, striped=True, animated=True, className="mb-3", style={"display": "none"}),
+            # Ville / région dont les séries sont prêtes (écrit par update_charts, lu par les callbacks légers)
+            dcc.Store(id="store-donnees"),
+            # Plage zoomée + largeur du graphique détaillé (mesurée dans le navigateur)
+            dcc.Store(id="store-zoom-detail"),
+
             # ONGLETS
             html.Div([
                 dbc.Tabs([
@@ -96,7 +126,7 @@ layout = dbc.Container([
 
                     dbc.Tab(label="Details", tab_id="tab-details", id="tab-container-details", children=[
                         dbc.Card([dbc.CardHeader("Heatmap Mensuelle"), dbc.CardBody(dcc.Graph(id='g-heatmap'))], className="shadow-sm border-0 mb-3 mt-3"),
-                        dbc.Card([dbc.CardHeader("Zoom Journalier"), dbc.CardBody(dbc.Row([
+                        dbc.Card([dbc.CardHeader("Zoom Journalier (zoomez / double-cliquez pour explorer les 75 ans)"), dbc.CardBody(dbc.Row([
                             dbc.Col(dcc.Graph(id='g-detail-ref'), width=12, lg=6),
                             dbc.Col(dcc.Graph(id='g-detail-main'), width=12, lg=6)
                         ]))], className="mb-3 shadow-sm border-0"),
@@ -115,7 +145,17 @@ layout = dbc.Container([
                                 dbc.CardHeader("Jours de Gel (Froid)"),
                                 dbc.CardBody(dcc.Graph(id='g-gel'))
                             ], className="shadow-sm border-0 mb-3 mt-3"), width=12, lg=6),
-                        ])
+                        ]),
+
+                        # Vagues de chaleur : jours consécutifs au-dessus du seuil canicule
+                        dbc.Card([
+                            dbc.CardHeader("Vagues de Chaleur (Episodes)"),
+                            dbc.CardBody([
+                                html.Label("Duree minimale d'un episode (jours) :", className="fw-bold"),
+                                dcc.Slider(id='slider-duree', min=2, max=10, step=1, value=3, marks={i: str(i) for i in range(2, 11)}),
+                                dcc.Graph(id='g-episodes')
+                            ])
+                        ], className="shadow-sm border-0 mb-3"),
                     ]),
                 ], id="tabs", active_tab="tab-synthese")
             ], id="tabs-container")
@@ -148,25 +188,31 @@ def update_cities(region, current):
     return opts, val
 
 # Callback Principal (Mise à jour des graphiques)
-@dash.callback(
-   [Output('g-compare', 'figure'), Output('g-master', 'figure'),
+# Exécuté en arrière-plan : un calcul régional à froid ne bloque plus le serveur
+@background_callback(
+   [Output('g-compare', 'figure'),
     Output('g-detail-ref', 'figure'), Output('g-detail-main', 'figure'),
-    Output('g-heatmap', 'figure'), Output('g-simulateur', 'figure'),
+    Output('g-simulateur', 'figure'),
     Output('g-gel', 'figure'),
     Output('g-saisons', 'figure'),
-    Output('kpi-mean', 'children'), Output('kpi-max', 'children'), Output('kpi-max-date', 'children'), Output('kpi-delta', 'children'),
+    Output('kpi-mean', 'children'), Output('kpi-max', 'children'), Output('kpi-max-date', 'children'),
     Output('dd-annee', 'value'),
     Output('resume-elu', 'children'),
     Output('row-resume', 'style'),
     Output('col-sidebar', 'style'),
     Output('col-graphs', 'width'),
     Output('tab-container-saisons', 'style'),
-    Output('tab-container-details', 'style')],
+    Output('tab-container-details', 'style'),
+    Output('store-donnees', 'data')],
    [Input('dd-region', 'value'), Input('dd-ville', 'value'),
     Input('slider-seuil', 'value'), Input('slider-gel', 'value'), Input('dd-annee', 'value'),
-    Input('g-master', 'clickData'), Input('switch-mode-elu', 'value')]
+    Input('g-master', 'clickData'), Input('switch-mode-elu', 'value')],
+   [State('session-id', 'data'), State('store-donnees', 'data')],
+   running=[(Output('progress-calcul', 'style'), {'display': 'flex'}, {'display': 'none'})],
+   progress=[Output('progress-calcul', 'value'), Output('progress-calcul', 'label')],
+   progress_default=[0, ""]
 )
-def update_charts(region, ville, seuil, seuil_gel, annee_dd, click_data, mode_elu):
+def update_charts(set_progress, region, ville, seuil, seuil_gel, annee_dd, click_data, mode_elu, session_id, donnees):
     # --- STYLE PAR DEFAUT ---
     style_resume = {'display': 'none'}
     style_sidebar = {'display': 'block'}
@@ -176,42 +222,35 @@ def update_charts(region, ville, seuil, seuil_gel, annee_dd, click_data, mode_el
 
     if not ville:
         empty = go.Figure()
-        return [empty]*7 + ["-", "-", "-", "-", annee_dd, "", style_resume, style_sidebar, width_graphs, style_tabs_complex, style_tabs_complex]
+        return [empty]*6 + ["-", "-", "-", annee_dd, "", style_resume, style_sidebar, width_graphs, style_tabs_complex, style_tabs_complex, None]
 
     annee = click_data['points'][0]['customdata'] if (ctx.triggered_id == 'g-master' and click_data) else annee_dd
 
+    # Anti-rebond : si une requête plus récente arrive (slider en cours de glissement), on abandonne
+    check_current = GATE.enter(session_id, 'update_charts')
+
     # 1. DONNÉES
+    set_progress((10, "Moyenne régionale..."))
     try:
-        # Calcul Région (Pondération ou Moyenne simple)
-        if region != "Toutes les regions" and 'weights' in ds_poids and region in ds_poids.coords.get('region', []):
-             mask_data = ds_poids['weights'].sel(region=region)
-             # On utilise 'temp_c' qui a été créé par le data_loader
-             df_reg = (ds['temp_c'] * mask_data).sum(['lat', 'lon']) / mask_data.sum(['lat', 'lon'])
-        else:
-             df_reg = ds['temp_c'].mean(['lat', 'lon'])
-
-        df_reg = df_reg.to_dataframe(name='temp').resample('YE')['temp'].mean()
+        # Calcul Région (Pondération ou Moyenne simple), partagé entre requêtes identiques
+        df_reg = extract_region_data(ds, ds_poids, region)
+        check_current()
 
         # Calcul Ville
-        row = df_villes[df_villes['label'] == ville].iloc[0]
-        t_lat, t_lon = row['lat'], row['lon']
-        offset = 0.25
-        subset = ds['temp_c'].sel(lat=slice(t_lat - offset, t_lat + offset), lon=slice(t_lon - offset, t_lon + offset))
-
-        # Gestion des points en mer ou vides
-        if subset.isnull().all() or subset.mean().isnull():
-            offset = 0.8
-            subset = ds['temp_c'].sel(lat=slice(t_lat - offset, t_lat + offset), lon=slice(t_lon - offset, t_lon + offset))
-
-        ts_ville = subset.mean(['lat', 'lon']).to_dataframe(name='temp')
+        set_progress((50, "Extraction de la ville..."))
+        ts_ville = city_entry(ds, df_villes, ville).data
+        check_current()
         df_vil_year = ts_ville.resample('YE')['temp'].mean()
 
+    except PreventUpdate:
+        raise
     except Exception as e:
         print(f"Erreur calculs : {e}")
         err = go.Figure().add_annotation(text="Donnees indisponibles", showarrow=False)
-        return [err]*7 + ["Err", "Err", "-", "Err", annee, "", style_resume, style_sidebar, width_graphs, style_tabs_complex, style_tabs_complex]
+        return [err]*6 + ["Err", "Err", "-", annee, "", style_resume, style_sidebar, width_graphs, style_tabs_complex, style_tabs_complex, None]
 
     # Calcul des KPIs
+    set_progress((80, "Graphiques..."))
     kpi_mean = f"{df_vil_year.mean():.1f}°C"
     val_max = ts_ville['temp'].max()
     kpi_max = f"{val_max:.1f}°C"
@@ -226,11 +265,12 @@ def update_charts(region, ville, seuil, seuil_gel, annee_dd, click_data, mode_el
         width_graphs = 12
         style_tabs_complex = {'display': 'none'}
 
-        nb_jours_chauds = int(ts_ville[ts_ville['temp'] > seuil].resample('YE')['temp'].count().iloc[-5:].mean())
-        jours_ete = ts_ville[ts_ville['temp'] > 25].resample('YE')['temp'].count()
-        gain_ete = int(jours_ete.iloc[-10:].mean() - jours_ete.iloc[:10].mean())
+        # Même calcul que les rapports générés en lot (utils/rapport.py)
+        resume = elu_summary(ts_ville['temp'], seuil)
+        nb_jours_chauds = int(resume['jours_chauds_recent'])
+        gain_ete = int(resume['gain_ete'])
         txt_ete = f"+{gain_ete} jours" if gain_ete > 0 else f"{gain_ete} jours"
-        annee_record = ts_ville['temp'].idxmax().year
+        annee_record = int(resume['annee_record'])
         couleur_cadre = "#64748B"
 
         texte_resume = dbc.Card([
@@ -278,12 +318,6 @@ def update_charts(region, ville, seuil, seuil_gel, annee_dd, click_data, mode_el
     fig_c.add_trace(go.Scatter(x=df_vil_year.index, y=df_vil_year, name=ville, line=dict(color='#2c3e50', width=width_line)))
     fig_c.update_layout(template="plotly_white", title="Trajectoire Temperatures", xaxis_title="Annee", yaxis_title="°C", margin=dict(l=40, r=20, t=40, b=40))
 
-    # G2 Warming Stripes
-    ano = df_vil_year - df_vil_year['1950':'1980'].mean()
-    colors = ['#e74c3c' if x > 0 else '#3498db' for x in ano]
-    fig_m = go.Figure(data=[go.Bar(x=ano.index.year, y=ano, marker_color=colors)])
-    fig_m.update_layout(template="plotly_white", xaxis_title="Annee", yaxis_title="Ecart", showlegend=False, margin=dict(l=40, r=20, t=20, b=40))
-
     # G3/G4 Zoom
     df_ref = ts_ville[ts_ville.index.year == premiere_annee_dispo]
     if df_ref.empty:
@@ -302,15 +336,6 @@ def update_charts(region, ville, seuil, seuil_gel, annee_dd, click_data, mode_el
     fig_main.add_hline(y=seuil, line_dash="dash", line_color="red")
     fig_main.update_layout(template="plotly_white", yaxis_range=[min_y, max_y], height=300, margin=dict(l=40, r=20, t=40, b=40))
 
-    # G5 Heatmap
-    hm = ts_ville.copy()
-    hm['Year'], hm['Mois'] = hm.index.year, hm.index.month
-    data_brute = hm.groupby(['Year', 'Mois'])['temp'].mean().unstack()
-    ref_period = hm[(hm['Year'] >= 1950) & (hm['Year'] <= 1980)]
-    data_ecart = data_brute - ref_period.groupby('Mois')['temp'].mean().values
-    fig_h = px.imshow(data_ecart, color_continuous_scale="RdBu_r", origin='lower', aspect="auto", zmin=-4, zmax=4)
-    fig_h.update_layout(template="plotly_white", height=400, margin=dict(l=40, r=20, t=20, b=40))
-
     # G6 Jours Canicule
     days = ts_ville[ts_ville['temp'] > seuil].resample('YE')['temp'].count().reindex(df_vil_year.index, fill_value=0)
     fig_s = px.bar(x=days.index.year, y=days.values, color=days.values, color_continuous_scale="OrRd")
@@ -331,6 +356,147 @@ def update_charts(region, ville, seuil, seuil_gel, annee_dd, click_data, mode_el
             fig_saisons.add_trace(go.Scatter(x=df_saison_yearly.index, y=df_saison_yearly[s], name=s, mode='lines'))
     fig_saisons.update_layout(template="plotly_white", xaxis_title="Annee", margin=dict(l=40, r=20, t=20, b=40))
 
-    return (fig_c, fig_m, fig_ref, fig_main, fig_h, fig_s, fig_gel, fig_saisons,
-            kpi_mean, kpi_max, kpi_max_date, kpi_delta, annee,
-            texte_resume, style_resume, style_sidebar, width_graphs, style_tabs_complex, style_tabs_complex)
\ No newline at end of file
+    # Séries prêtes (cache par ville / tableau régional) : déclenche les callbacks légers
+    pretes = {'region': region, 'ville': ville}
+    return (fig_c, fig_ref, fig_main, fig_s, fig_gel, fig_saisons,
+            kpi_mean, kpi_max, kpi_max_date, annee,
+            texte_resume, style_resume, style_sidebar, width_graphs, style_tabs_complex, style_tabs_complex,
+            dash.no_update if pretes == donnees else pretes)
+
+
+# Périodes de référence : anomalies et réchauffement par différences de sommes
+# cumulées (temps constant), sans relire les données journalières. Déclenché par
+# store-donnees une fois les séries extraites par update_charts : ce callback
+# synchrone ne lit jamais le cube, il ne fait que des différences de sommes.
+@dash.callback(
+    [Output('g-master', 'figure'), Output('g-heatmap', 'figure'),
+     Output('kpi-delta', 'children'), Output('kpi-delta-label', 'children'), Output('kpi-trend', 'children')],
+    [Input('store-donnees', 'data'),
+     Input('slider-reference', 'value'), Input('slider-periode-a', 'value'), Input('slider-periode-b', 'value')]
+)
+def update_reference(donnees, reference, periode_a, periode_b):
+    if not donnees:
+        return go.Figure(), go.Figure(), "-", "", ""
+    region, ville = donnees['region'], donnees['ville']
+
+    stats_ville = city_stats(ds, df_villes, ville, warm_only=True)
+    # Moyenne simple de la grille : pas de comparaison régionale
+    stats_reg = region_stats(ds, ds_poids, region, warm_only=True) if region != TOUTES_REGIONS else None
+    if stats_ville is None:
+        raise PreventUpdate
+
+    # G2 Warming Stripes (customdata : année cliquée -> zoom journalier)
+    ano = stats_ville.annual_anomaly(*reference)
+    colors = ['#e74c3c' if x > 0 else '#3498db' for x in ano]
+    fig_m = go.Figure(data=[go.Bar(x=ano.index, y=ano, marker_color=colors, customdata=ano.index)])
+    fig_m.update_layout(template="plotly_white", xaxis_title="Annee", yaxis_title=f"Ecart ({reference[0]}-{reference[1]})", showlegend=False, margin=dict(l=40, r=20, t=20, b=40))
+
+    # G5 Heatmap
+    data_ecart = stats_ville.monthly_anomaly(*reference)
+    fig_h = px.imshow(data_ecart, color_continuous_scale="RdBu_r", origin='lower', aspect="auto", zmin=-4, zmax=4)
+    fig_h.update_layout(template="plotly_white", height=400, margin=dict(l=40, r=20, t=20, b=40))
+
+    # KPI Réchauffement : période B vs période A
+    delta = stats_ville.delta(periode_a, periode_b)
+    kpi_delta = f"+{delta:.1f}°C" if delta > 0 else f"{delta:.1f}°C"
+    label = f"Difference {periode_b[0]}-{periode_b[1]} vs {periode_a[0]}-{periode_a[1]}"
+    if stats_reg is not None:
+        label += f" (region : {stats_reg.delta(periode_a, periode_b):+.1f}°C)"
+
+    # Tendance sur toute la période (OLS + intervalle de confiance, pente de Sen), en °C / décennie
+    tendance = trend_table(pd.DataFrame([stats_ville.annual_mean], columns=stats_ville.years)).iloc[0][['pente_ols', 'ic_bas', 'ic_haut', 'pente_sen']] * 10
+    txt_tendance = f"Tendance : {tendance['pente_ols']:+.2f}°C/decennie (IC95% {tendance['ic_bas']:+.2f} ; {tendance['ic_haut']:+.2f}), Sen {tendance['pente_sen']:+.2f}"
+
+    return fig_m, fig_h, kpi_delta, label, txt_tendance
+
+
+# Zoom multi-résolution : le niveau de la pyramide (jour / semaine / mois / année)
+# dépend de la plage visible, le nombre de points envoyés reste borné.
+# Pyramides construites sur les séries déjà extraites (store-donnees) uniquement.
+# La largeur réelle du graphique est lue côté client avec la plage zoomée
+dash.clientside_callback(
+    ZOOM_CLIENTSIDE,
+    Output('store-zoom-detail', 'data'),
+    Input('g-detail-main', 'relayoutData'),
+    prevent_initial_call=True
+)
+
+
+@dash.callback(
+    Output('g-detail-main', 'figure', allow_duplicate=True),
+    Input('store-zoom-detail', 'data'),
+    [State('store-donnees', 'data'), State('slider-seuil', 'value')],
+    prevent_initial_call=True
+)
+def zoom_detail(zoom, donnees, seuil):
+    plage = relayout_range((zoom or {}).get('relayout'))
+    if not donnees or plage is None:
+        raise PreventUpdate
+    region, ville = donnees['region'], donnees['ville']
+
+    pyr_ville = city_pyramid(ds, df_villes, ville, warm_only=True)
+    if pyr_ville is None:
+        raise PreventUpdate
+    if plage == "auto":
+        # Double-clic : vue complète (75 ans)
+        debut, fin = pyr_ville["D"].index[0], pyr_ville["D"].index[-1]
+    else:
+        debut, fin = pd.Timestamp(plage[0]), pd.Timestamp(plage[1])
+
+    niveau, serie = select_level(pyr_ville, debut, fin, zoom_width(zoom))
+
+    fig = go.Figure()
+    pyr_reg = region_pyramid(ds, ds_poids, region, warm_only=True) if region != TOUTES_REGIONS else None
+    if pyr_reg is not None:
+        serie_reg = pyr_reg[niveau].loc[debut:fin]
+        fig.add_trace(go.Scatter(x=serie_reg.index, y=serie_reg.values, name="Moyenne Region", line=dict(color='gray', dash='dot')))
+    fig.add_trace(go.Scatter(x=serie.index, y=serie.values, name=ville, line=dict(color='#2c3e50')))
+    fig.add_hline(y=seuil, line_dash="dash", line_color="red")
+    fig.update_layout(template="plotly_white", title=f"{debut:%d/%m/%Y} - {fin:%d/%m/%Y} ({LEVEL_NAMES[niveau]})",
+                      xaxis_range=[debut, fin], showlegend=False, height=300, margin=dict(l=40, r=20, t=40, b=40))
+    return fig
+
+
+# Vagues de chaleur : détection vectorisée des épisodes (recalcul instantané
+# quand le seuil ou la durée minimale changent), sur la série déjà extraite
+@dash.callback(
+    Output('g-episodes', 'figure'),
+    [Input('store-donnees', 'data'), Input('slider-seuil', 'value'), Input('slider-duree', 'value')]
+)
+def update_episodes(donnees, seuil, duree):
+    if not donnees:
+        return go.Figure()
+    ville = donnees['ville']
+
+    entry = city_entry(ds, df_villes, ville, warm_only=True)
+    if entry is None:
+        raise PreventUpdate
+    ts_ville = entry.data['temp'].asfreq('D')
+
+    res = detect_episodes(ts_ville.values, ts_ville.index, seuil, duree)
+    nb, plus_long, degres = res['count'][:, 0], res['longest'][:, 0], res['degree_days'][:, 0]
+
+    fig = go.Figure(go.Bar(
+        x=res['years'], y=nb, marker=dict(color=degres, colorscale="OrRd", showscale=True, colorbar=dict(title="°C.j")),
+        customdata=np.stack([plus_long, degres], axis=1),
+        hovertemplate="%{x} : %{y} episode(s)<br>Plus long : %{customdata[0]} jours<br>Intensite : %{customdata[1]:.1f} °C.j<extra></extra>"
+    ))
+    fig.update_layout(template="plotly_white", title=f"Episodes >= {duree} jours > {seuil}°C (total : {nb.sum()}, record : {plus_long.max()} jours)",
+                      xaxis_title="Annee", yaxis_title="Episodes", margin=dict(l=40, r=20, t=40, b=40))
+    return fig
+
+
+# Niveau de retour (GEV) : lu dans la table pré-calculée par utils/extremes.py
+@dash.callback(
+    Output('kpi-retour', 'children'),
+    Input('dd-ville', 'value')
+)
+def update_return_level(ville):
+    if not ville:
+        return ""
+    row = df_villes[df_villes['label'] == ville].iloc[0]
+    niveau = city_return_level(ds, row['lat'], row['lon'])
+    if niveau is None:
+        return ""
+    ic = f" [{niveau['ic_bas']:.1f} ; {niveau['ic_haut']:.1f}]" if not np.isnan(niveau['ic_bas']) else ""
+    return f"1 fois en {int(niveau['periode'])} ans : {niveau['niveau']:.1f}°C{ic}"
@@ -1,5 +1,6 @@
 import dash
-from dash import dcc, html, Input, Output, callback
+from dash import dcc, html, Input, Output, State, callback
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
 import plotly.graph_objects as go
 import pandas as pd
@@ -7,6 +8,11 @@ import numpy as np
 
 # Import du Data Loader
 from utils.data_loader import load_all_data
+from utils.background import background_callback
+from utils.coalescing import GATE
+from utils.episodes import detect_episodes
+from utils.extraction import city_entry, extract_many_cities
+from utils.pyramid import LEVEL_NAMES, ZOOM_CLIENTSIDE, city_pyramid, relayout_range, select_level, zoom_width
 
 dash.register_page(__name__, path='/comparaison', name='2. Comparaison Villes')
 
@@ -67,6 +73,13 @@ layout = dbc.Container([
 
         # --- GRAPHIQUES (AVEC ONGLETS) ---
         dbc.Col([
+            # Progression du calcul (visible uniquement pendant l'extraction)
+            dbc.Progress(id="comp-progress", value=0, striped=True, animated=True, className="mb-3", style={"display": "none"}),
+            # Villes dont les séries sont prêtes (écrit par update_comparison_graphs)
+            dcc.Store(id="comp-store-donnees"),
+            # Plage zoomée + largeur du graphique journalier (mesurée dans le navigateur)
+            dcc.Store(id="comp-store-zoom"),
+
             dbc.Tabs([
                 # ONGLET 1 : VUE D'ENSEMBLE
                 dbc.Tab(label="Vue d'ensemble (75 ans)", children=[
@@ -89,7 +102,17 @@ layout = dbc.Container([
                             dbc.CardHeader("🔥 Jours de Canicule (Variable selon seuil)"),
                             dbc.CardBody(dcc.Graph(id='g-comp-hot'))
                         ], className="h-100 shadow-sm border-0"), width=12, lg=6),
-                    ])
+                    ]),
+
+                    # Graphique 4 : Vagues de chaleur (épisodes de jours consécutifs)
+                    dbc.Card([
+                        dbc.CardHeader("🌡️ Vagues de Chaleur (Épisodes)"),
+                        dbc.CardBody([
+                            html.Label("Durée minimale d'un épisode (jours) :", className="fw-bold"),
+                            dcc.Slider(id='comp-slider-duree', min=2, max=10, step=1, value=3, marks={i: str(i) for i in range(2, 11)}),
+                            dcc.Graph(id='g-comp-episodes')
+                        ])
+                    ], className="mt-4 shadow-sm border-0"),
                 ]),
 
                 # ONGLET 2 : ZOOM ANNÉE (NOUVEAU)
@@ -128,43 +151,45 @@ def update_city_options(region):
     return opts, opts
 
 
-# B. Mise à jour des graphiques
-@callback(
+# B. Mise à jour des graphiques (en arrière-plan : deux extractions de villes)
+@background_callback(
     [Output('g-comp-timeline', 'figure'),
      Output('g-comp-saison', 'figure'),
      Output('g-comp-hot', 'figure'),
      Output('g-comp-zoom-daily', 'figure'),
-     Output('titre-zoom-annee', 'children')],
+     Output('titre-zoom-annee', 'children'),
+     Output('comp-store-donnees', 'data')],
     [Input('comp-ville-a', 'value'), Input('comp-ville-b', 'value'),
-     Input('comp-slider-seuil', 'value'), Input('comp-year-zoom', 'value')]
+     Input('comp-slider-seuil', 'value'), Input('comp-year-zoom', 'value')],
+    [State('session-id', 'data'), State('comp-store-donnees', 'data')],
+    running=[(Output('comp-progress', 'style'), {'display': 'flex'}, {'display': 'none'})],
+    progress=[Output('comp-progress', 'value'), Output('comp-progress', 'label')],
+    progress_default=[0, ""]
 )
-def update_comparison_graphs(va, vb, seuil, annee_zoom):
+def update_comparison_graphs(set_progress, va, vb, seuil, annee_zoom, session_id, donnees):
     empty_fig = go.Figure().add_annotation(text="Sélectionnez deux villes", showarrow=False)
 
     if not va or not vb:
-        return empty_fig, empty_fig, empty_fig, empty_fig, "Zoom Année"
+        return empty_fig, empty_fig, empty_fig, empty_fig, "Zoom Année", None
 
-    # --- FONCTION D'EXTRACTION ---
-    def extract_city_data(ville_name):
-        try:
-            row = df_villes[df_villes['label'] == ville_name].iloc[0]
-            lat, lon = row['lat'], row['lon']
-            offset = 0.25
-            subset = ds['temp_c'].sel(lat=slice(lat - offset, lat + offset), lon=slice(lon - offset, lon + offset))
+    # Anti-rebond : abandon si une requête plus récente arrive pendant le calcul
+    check_current = GATE.enter(session_id, 'update_comparison_graphs')
 
-            if subset.isnull().all() or subset.mean().isnull():
-                offset = 0.8
-                subset = ds['temp_c'].sel(lat=slice(lat - offset, lat + offset), lon=slice(lon - offset, lon + offset))
+    # --- EXTRACTION PARALLÈLE DES DEUX VILLES ---
+    set_progress((10, "Extraction des villes..."))
+    done = []
 
-            return subset.mean(['lat', 'lon']).to_dataframe(name='temp')
-        except:
-            return pd.DataFrame()
+    def on_done(ville_name, seconds):
+        done.append(ville_name)
+        set_progress((10 + 40 * len(done), f"{ville_name} extraite ({seconds:.1f}s)"))
 
-    df_a = extract_city_data(va)
-    df_b = extract_city_data(vb)
+    series, _ = extract_many_cities(ds, df_villes, [va, vb], on_done=on_done)
+    check_current()
+    df_a, df_b = series[va], series[vb]
+    set_progress((90, "Graphiques..."))
 
     if df_a.empty or df_b.empty:
-        return empty_fig, empty_fig, empty_fig, empty_fig, f"Zoom {annee_zoom}"
+        return empty_fig, empty_fig, empty_fig, empty_fig, f"Zoom {annee_zoom}", None
 
     # ==========================
     # ONGLET 1 : VUE D'ENSEMBLE
@@ -180,10 +205,9 @@ def update_comparison_graphs(va, vb, seuil, annee_zoom):
     fig_time.update_layout(template="plotly_white", margin=dict(l=40, r=20, t=20, b=40), hovermode="x unified", title="Moyenne Annuelle")
 
     # G2 : Saisonnalité
-    df_a['Mois'] = df_a.index.month
-    df_b['Mois'] = df_b.index.month
-    sa = df_a.groupby('Mois')['temp'].mean()
-    sb = df_b.groupby('Mois')['temp'].mean()
+    # Pas de colonne ajoutée : les séries extraites sont partagées entre requêtes
+    sa = df_a.groupby(df_a.index.month)['temp'].mean()
+    sb = df_b.groupby(df_b.index.month)['temp'].mean()
 
     mois_noms = ['Jan', 'Fév', 'Mar', 'Avr', 'Mai', 'Juin', 'Juil', 'Août', 'Sep', 'Oct', 'Nov', 'Déc']
     fig_saison = go.Figure()
@@ -231,4 +255,92 @@ def update_comparison_graphs(va, vb, seuil, annee_zoom):
     else:
         fig_zoom.add_annotation(text="Pas de données pour cette année", showarrow=False)
 
-    return fig_time, fig_saison, fig_hot, fig_zoom, f"🔎 Zoom Détail : {annee_zoom}"
\ No newline at end of file
+    # Séries prêtes (cache par ville) : déclenche les callbacks légers
+    pretes = {'a': va, 'b': vb}
+    return (fig_time, fig_saison, fig_hot, fig_zoom, f"🔎 Zoom Détail : {annee_zoom}",
+            dash.no_update if pretes == donnees else pretes)
+
+
+# C. Zoom multi-résolution sur la comparaison journalière (pyramide temporelle),
+# à la largeur réelle du graphique (lue côté client avec la plage zoomée)
+dash.clientside_callback(
+    ZOOM_CLIENTSIDE,
+    Output('comp-store-zoom', 'data'),
+    Input('g-comp-zoom-daily', 'relayoutData'),
+    prevent_initial_call=True
+)
+
+
+@callback(
+    Output('g-comp-zoom-daily', 'figure', allow_duplicate=True),
+    Input('comp-store-zoom', 'data'),
+    [State('comp-store-donnees', 'data'), State('comp-slider-seuil', 'value')],
+    prevent_initial_call=True
+)
+def zoom_comparison(zoom, donnees, seuil):
+    plage = relayout_range((zoom or {}).get('relayout'))
+    if not donnees or plage is None:
+        raise PreventUpdate
+    va, vb = donnees['a'], donnees['b']
+
+    # Séries déjà extraites par update_comparison_graphs uniquement
+    pyr_a = city_pyramid(ds, df_villes, va, warm_only=True)
+    pyr_b = city_pyramid(ds, df_villes, vb, warm_only=True)
+    if pyr_a is None or pyr_b is None:
+        raise PreventUpdate
+    if plage == "auto":
+        # Double-clic : vue complète (75 ans)
+        debut, fin = pyr_a["D"].index[0], pyr_a["D"].index[-1]
+    else:
+        debut, fin = pd.Timestamp(plage[0]), pd.Timestamp(plage[1])
+
+    # Même niveau pour les deux villes pour que les courbes restent comparables
+    niveau, zoom_a = select_level(pyr_a, debut, fin, zoom_width(zoom))
+    zoom_b = pyr_b[niveau].loc[debut:fin]
+
+    fig_zoom = go.Figure()
+    fig_zoom.add_trace(go.Scatter(x=zoom_a.index, y=zoom_a.values, name=va, line=dict(color=COLOR_A, width=1.5)))
+    fig_zoom.add_trace(go.Scatter(x=zoom_b.index, y=zoom_b.values, name=vb, line=dict(color=COLOR_B, width=1.5)))
+    fig_zoom.add_hline(y=seuil, line_dash="dot", line_color="red", annotation_text=f"Seuil {seuil}°C")
+    fig_zoom.update_layout(
+        template="plotly_white",
+        title=f"Comparaison {debut:%d/%m/%Y} - {fin:%d/%m/%Y} ({LEVEL_NAMES[niveau]})",
+        yaxis_title="Température (°C)",
+        xaxis_range=[debut, fin],
+        hovermode="x unified"
+    )
+    return fig_zoom
+
+
+# D. Vagues de chaleur : les deux villes traitées dans un seul lot vectorisé.
+# Déclenché par comp-store-donnees : seules les séries déjà extraites sont lues
+@callback(
+    Output('g-comp-episodes', 'figure'),
+    [Input('comp-store-donnees', 'data'),
+     Input('comp-slider-seuil', 'value'), Input('comp-slider-duree', 'value')]
+)
+def update_comparison_episodes(donnees, seuil, duree):
+    if not donnees:
+        return go.Figure().add_annotation(text="Sélectionnez deux villes", showarrow=False)
+    va, vb = donnees['a'], donnees['b']
+
+    entry_a = city_entry(ds, df_villes, va, warm_only=True)
+    entry_b = city_entry(ds, df_villes, vb, warm_only=True)
+    if entry_a is None or entry_b is None:
+        raise PreventUpdate
+    matrix = pd.concat({va: entry_a.data['temp'], vb: entry_b.data['temp']}, axis=1).asfreq('D')
+
+    res = detect_episodes(matrix.values, matrix.index, seuil, duree)
+
+    fig = go.Figure()
+    for k, (ville, couleur) in enumerate([(va, COLOR_A), (vb, COLOR_B)]):
+        if k == 1 and vb == va:
+            break
+        fig.add_trace(go.Bar(
+            x=res['years'], y=res['count'][:, k], name=f"{ville} ({res['count'][:, k].sum()} épisodes)", marker_color=couleur, opacity=0.7,
+            customdata=np.stack([res['longest'][:, k], res['degree_days'][:, k]], axis=1),
+            hovertemplate="%{y} épisode(s)<br>Plus long : %{customdata[0]} jours<br>Intensité : %{customdata[1]:.1f} °C.j"
+        ))
+    fig.update_layout(template="plotly_white", barmode='group', hovermode="x unified", margin=dict(l=30, r=20, t=40, b=30),
+                      title=f"Épisodes ≥ {duree} jours > {seuil}°C", yaxis_title="Épisodes")
+    return fig
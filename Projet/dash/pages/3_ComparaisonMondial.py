@@ -2,36 +2,19 @@ import dash
 from dash import dcc, html, callback, Input, Output
 import dash_bootstrap_components as dbc
 import plotly.express as px
-import pandas as pd
-from pathlib import Path
+
+from utils.data_loader import load_world_data
+from utils.trends import trend_table
 
 # Enregistrement de la page
 dash.register_page(__name__, path='/comparateur-pays', name='3. Comparateur International')
 
 # =============================================================================
-# 1. CHARGEMENT DES DONNÉES (LOCAL À LA PAGE)
+# 1. CHARGEMENT DES DONNÉES
 # =============================================================================
 
-# Définition du chemin relatif vers le CSV
-# On remonte : pages -> dash -> Projet -> Donnees
-BASE_DIR = Path(__file__).resolve().parent.parent.parent
-PATH_DATA = BASE_DIR / "Donnees" / "DonneesTemperaturePays" / "GlobalLandTemperaturesByCountry.csv"
-
-def load_data():
-    """ Charge et nettoie les données internationales """
-    if not PATH_DATA.exists():
-        print(f"[ERREUR] Fichier introuvable : {PATH_DATA}")
-        return pd.DataFrame(columns=['dt', 'AverageTemperature', 'Country', 'Annee'])
-
-    print(f">> [Page 3] Chargement du CSV International...")
-    # On ne charge que les colonnes utiles pour optimiser la mémoire
-    df = pd.read_csv(PATH_DATA, usecols=['dt', 'AverageTemperature', 'Country'])
-    df['dt'] = pd.to_datetime(df['dt'])
-    df['Annee'] = df['dt'].dt.year
-    return df
-
 # Chargement unique au démarrage
-df_monde = load_data()
+df_monde = load_world_data()  # partagé avec la route /data/pays/matrice.json
 pays_disponibles = sorted(df_monde['Country'].unique()) if not df_monde.empty else []
 
 THEME_COLOR = "#2C3E50"
@@ -94,7 +77,8 @@ layout = dbc.Container([
         dbc.Col(dbc.Card(dbc.CardBody([
             html.H6("Tendance Globale (Sélection)", className="text-muted small fw-bold"),
             html.H2(id="kpi-pays-trend", className="text-warning fw-bold"),
-            html.Small("Hausse moyenne sur la période", className="text-muted")
+            html.Small("Hausse moyenne sur la période", className="text-muted"),
+            html.Small(id="kpi-trend-detail", className="d-block text-muted small")
         ])), width=12, md=4),
     ], className="mb-4"),
 
@@ -118,17 +102,17 @@ layout = dbc.Container([
     [Output('graphique-pays-temp', 'figure'),
      Output('kpi-pays-chaud', 'children'), Output('kpi-val-chaud', 'children'),
      Output('kpi-pays-froid', 'children'), Output('kpi-val-froid', 'children'),
-     Output('kpi-pays-trend', 'children')],
+     Output('kpi-pays-trend', 'children'), Output('kpi-trend-detail', 'children')],
     [Input('selection-pays', 'value'),
      Input('slider-periode', 'value')]
 )
 def update_graph_and_kpis(pays_selectionnes, periode):
     # Sécurité : Si données vides ou pas de pays
     if df_monde.empty:
-        return px.line(title="Erreur : Données introuvables"), "-", "-", "-", "-", "-"
+        return px.line(title="Erreur : Données introuvables"), "-", "-", "-", "-", "-", "-"
 
     if not pays_selectionnes:
-        return px.line(title="Veuillez sélectionner au moins un pays"), "-", "-", "-", "-", "-"
+        return px.line(title="Veuillez sélectionner au moins un pays"), "-", "-", "-", "-", "-", "-"
 
     # 1. Filtrage (Pays + Dates)
     mask = (df_monde['Country'].isin(pays_selectionnes)) & \
@@ -138,7 +122,7 @@ def update_graph_and_kpis(pays_selectionnes, periode):
     df_filtre = df_monde[mask].copy()
 
     if df_filtre.empty:
-        return px.line(title="Pas de données pour cette période"), "-", "-", "-", "-", "-"
+        return px.line(title="Pas de données pour cette période"), "-", "-", "-", "-", "-", "-"
 
     # 2. Aggrégation annuelle pour le graphique (plus léger que mensuel)
     df_annuel = df_filtre.groupby(['Country', 'Annee'])['AverageTemperature'].mean().reset_index()
@@ -163,6 +147,13 @@ def update_graph_and_kpis(pays_selectionnes, periode):
     delta = fin - debut
     txt_delta = f"{delta:+.1f}°C"
 
+    # Tendances par pays (OLS + Mann-Kendall / Sen, vectorisées sur la matrice pays × années)
+    tendances = trend_table(df_annuel.pivot(index='Country', columns='Annee', values='AverageTemperature'))
+    nb_signif = int((tendances['p_mk'] < 0.05).sum())
+    txt_tendance = (f"Pente OLS moyenne {tendances['pente_ols'].mean() * 10:+.2f}°C/déc., "
+                    f"Sen médiane {tendances['pente_sen'].median() * 10:+.2f}°C/déc. "
+                    f"({nb_signif}/{len(tendances)} pays significatifs)")
+
     # 4. Graphique
     fig = px.line(
         df_annuel,
@@ -175,4 +166,4 @@ def update_graph_and_kpis(pays_selectionnes, periode):
     # Utilisation d'un template standard inclus dans Plotly
     fig.update_layout(template='plotly_white', margin=dict(l=40, r=20, t=40, b=40), hovermode="x unified")
 
-    return fig, top_hot, f"{val_hot:.1f}°C", top_cold, f"{val_cold:.1f}°C", txt_delta
\ No newline at end of file
+    return fig, top_hot, f"{val_hot:.1f}°C", top_cold, f"{val_cold:.1f}°C", txt_delta, txt_tendance
\ No newline at end of file
@@ -0,0 +1,58 @@
+"""
+Données synthétiques communes aux tests (lancement depuis Projet/dash : python -m pytest -q).
+Les modules utils.* sont comparés à un calcul pandas / xarray de référence, sur de
+petits cubes générés ici : aucun fichier de Donnees/ n'est nécessaire.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def make_cube(start="1950-01-01", end="1959-12-31", lat=(44.0, 46.0), lon=(1.0, 3.5), step=0.25, seed=0):
+    """
+    Cube (time, lat, lon) de températures journalières en °C : saisonnalité +
+    tendance + bruit. Le coin sud-ouest est en mer (NaN sur toute la période) et
+    quelques journées isolées manquent.
+    """
+    rng = np.random.default_rng(seed)
+    times = pd.date_range(start, end, freq="D")
+    lats = np.round(np.arange(lat[0], lat[1] + 1e-9, step), 6)
+    lons = np.round(np.arange(lon[0], lon[1] + 1e-9, step), 6)
+    saison = 12 + 10 * np.sin(2 * np.pi * (times.dayofyear.values - 110) / 365.25)
+    tendance = np.linspace(0, 1.5, len(times))
+    values = (saison + tendance)[:, None, None] + rng.normal(0, 5, (len(times), len(lats), len(lons)))
+    values[:, :3, :3] = np.nan
+    values[rng.random(values.shape) < 0.002] = np.nan
+    return xr.Dataset({"temp_c": (("time", "lat", "lon"), values.astype(np.float32))},
+                      coords={"time": times, "lat": lats, "lon": lons})
+
+
+@pytest.fixture
+def cube():
+    return make_cube()
+
+
+@pytest.fixture
+def villes():
+    """ Villes du cube : deux à l'intérieur, une côtière (petite fenêtre en mer) """
+    return pd.DataFrame({
+        "label": ["Alpha", "Beta", "Cote"],
+        "lat": [45.1, 45.6, 44.1],
+        "lon": [2.2, 3.0, 1.1],
+        "Region_Assignee": ["Nord", "Nord", "Sud"],
+    })
+
+
+def reference_city_series(ds, lat, lon):
+    """ Série de référence d'une ville : .sel ±0.25°, élargie à ±0.8° si vide (règle de la page 1) """
+    for offset in (0.25, 0.8):
+        window = ds["temp_c"].sel(lat=slice(lat - offset, lat + offset), lon=slice(lon - offset, lon + offset))
+        if not window.isnull().all():
+            break
+    return window.mean(["lat", "lon"]).to_series()
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.anomalies import CumulativeStats
+
+
+@pytest.fixture
+def series():
+    """ 30 ans journaliers avec des trous : un mois entier, une année entière, des jours isolés """
+    index = pd.date_range("1950-01-01", "1979-12-31", freq="D")
+    rng = np.random.default_rng(3)
+    values = 12 + 10 * np.sin(2 * np.pi * index.dayofyear.values / 365.25) + rng.normal(0, 4, len(index))
+    series = pd.Series(values, index=index)
+    series[rng.random(len(index)) < 0.05] = np.nan
+    series["1955-03"] = np.nan
+    series["1960"] = np.nan
+    return series
+
+
+def test_annual_and_monthly_means_match_resample(series):
+    stats = CumulativeStats(series)
+    annuel = series.resample("YE").mean()
+    mensuel = series.resample("ME").mean()
+    np.testing.assert_array_equal(stats.years, np.arange(1950, 1980))
+    np.testing.assert_allclose(stats.annual_mean, annuel.values)
+    np.testing.assert_allclose(stats.monthly_mean.ravel(), mensuel.values)
+
+
+@pytest.mark.parametrize("start, end", [(1950, 1979), (1951, 1980), (1958, 1962), (1960, 1960), (1940, 1952)])
+def test_period_mean_matches_resample(series, start, end):
+    annuel = series.resample("YE").mean()
+    expected = annuel[(annuel.index.year >= start) & (annuel.index.year <= end)].mean()
+    got = CumulativeStats(series).period_mean(start, end)
+    if np.isnan(expected):
+        assert np.isnan(got)
+    else:
+        assert got == pytest.approx(expected)
+
+
+def test_monthly_baseline_and_anomaly_match_groupby(series):
+    stats = CumulativeStats(series)
+    periode = series["1951":"1970"]
+    baseline = periode.groupby(periode.index.month).mean()
+    np.testing.assert_allclose(stats.monthly_baseline(1951, 1970), baseline.values)
+
+    mensuel = series.resample("ME").mean()
+    expected = (mensuel - baseline.reindex(mensuel.index.month).values).values.reshape(30, 12)
+    np.testing.assert_allclose(stats.monthly_anomaly(1951, 1970).values, expected)
+
+
+def test_annual_anomaly_and_delta(series):
+    stats = CumulativeStats(series)
+    annuel = series.resample("YE").mean()
+    reference = annuel["1961":"1970"].mean()
+    np.testing.assert_allclose(stats.annual_anomaly(1961, 1970).values, (annuel - reference).values)
+    assert stats.delta((1950, 1959), (1970, 1979)) == pytest.approx(annuel["1970":].mean() - annuel[:"1959"].mean())
@@ -0,0 +1,103 @@
+import threading
+import time
+
+import diskcache
+import pytest
+from dash.exceptions import PreventUpdate
+
+from utils.coalescing import MemoryLRU, RequestGate, SingleFlight
+
+
+def test_single_flight_runs_concurrent_calls_once():
+    flights, calls = SingleFlight(), []
+    start = threading.Barrier(5)
+
+    def slow(x):
+        calls.append(x)
+        time.sleep(0.2)
+        return x * 2
+
+    results = []
+
+    def worker():
+        start.wait()
+        results.append(flights.do("k", slow, 21))
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert calls == [21]
+    assert results == [42] * 5
+
+
+def test_single_flight_propagates_errors_and_forgets_key():
+    flights = SingleFlight()
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flights.do("k", fail)
+    assert flights.do("k", lambda: 1) == 1
+
+
+def test_single_flight_shares_results_through_cache(tmp_path):
+    cache = diskcache.Cache(str(tmp_path))
+    first, second = SingleFlight(cache, ttl=60), SingleFlight(cache, ttl=60)  # deux "processus"
+    calls = []
+
+    assert first.peek("k") is None
+    assert first.do("k", lambda: calls.append(1) or "valeur") == "valeur"
+    assert second.do("k", lambda: calls.append(2) or "autre") == "valeur"
+    assert second.peek("k") == "valeur"
+    assert calls == [1]
+
+
+def test_memory_lru_evicts_least_recently_used():
+    lru = MemoryLRU(maxsize=2)
+    lru.put("a", 1)
+    lru.put("b", 2)
+    assert lru.get("a") == 1  # "a" devient le plus récent
+    lru.put("c", 3)
+    assert lru.get("b") is None
+    assert lru.get("a") == 1 and lru.get("c") == 3
+
+
+def test_memory_lru_put_keeps_existing_value_and_builds_once():
+    lru, builds = MemoryLRU(), []
+    assert lru.put("a", 1) == 1
+    assert lru.put("a", 2) == 1
+    assert lru.get_or_build("b", lambda: builds.append(1) or "x") == "x"
+    assert lru.get_or_build("b", lambda: builds.append(2) or "y") == "x"
+    assert builds == [1]
+
+
+@pytest.mark.parametrize("shared", [False, True])
+def test_request_gate_drops_superseded_requests(tmp_path, shared):
+    gate = RequestGate(diskcache.Cache(str(tmp_path)) if shared else None)
+    t0 = time.perf_counter()
+    old = gate.enter("session", "slot")
+    assert time.perf_counter() - t0 < 0.1  # pas d'attente fixe
+    old()
+
+    new = gate.enter("session", "slot")
+    with pytest.raises(PreventUpdate):
+        old()
+    new()
+    gate.enter("autre-session", "slot")
+    new()  # une autre session ne compte pas
+
+
+def test_request_gate_without_session_is_a_no_op():
+    check = RequestGate().enter(None, "slot")
+    check()
+
+
+def test_request_gate_memory_counters_are_bounded():
+    gate = RequestGate(maxsize=3)
+    for k in range(50):
+        gate.enter(f"session-{k}", "slot")
+    assert len(gate._counters._items) == 3
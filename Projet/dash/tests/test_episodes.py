@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.episodes import detect_episodes
+
+
+def reference(values, dates, seuil, min_len):
+    """ Compteur de plages jour par jour (boucle Python), une série à la fois """
+    years = np.unique(dates.year)
+    out = {name: np.zeros((len(years), values.shape[1])) for name in ("count", "longest", "degree_days")}
+    for col in range(values.shape[1]):
+        run, start, excess = 0, None, 0.0
+        for day in range(len(dates) + 1):
+            value = values[day, col] if day < len(dates) else np.nan
+            if value > seuil:
+                if run == 0:
+                    start, excess = day, 0.0
+                run += 1
+                excess += value - seuil
+                continue
+            if run >= min_len:
+                k = np.searchsorted(years, dates[start].year)
+                out["count"][k, col] += 1
+                out["longest"][k, col] = max(out["longest"][k, col], run)
+                out["degree_days"][k, col] += excess
+            run = 0
+    return years, out
+
+
+@pytest.mark.parametrize("min_len", [1, 3, 5])
+def test_detect_episodes_matches_loop(min_len):
+    dates = pd.date_range("1990-01-01", "1999-12-31", freq="D")
+    rng = np.random.default_rng(4)
+    # Marche aléatoire autour du seuil : plages de longueurs variées, à cheval sur le 31/12
+    values = 28 + np.cumsum(rng.normal(0, 1.2, (len(dates), 4)), axis=0) % 6
+    values[rng.random(values.shape) < 0.01] = np.nan
+
+    got = detect_episodes(values, dates, seuil=30, min_len=min_len)
+    years, expected = reference(values, dates, 30, min_len)
+    np.testing.assert_array_equal(got["years"], years)
+    np.testing.assert_array_equal(got["count"], expected["count"])
+    np.testing.assert_array_equal(got["longest"], expected["longest"])
+    np.testing.assert_allclose(got["degree_days"], expected["degree_days"])
+    assert got["count"].sum() > 0
+
+
+def test_episode_counted_in_year_of_first_day_and_nan_breaks_run():
+    dates = pd.date_range("2000-12-29", "2001-01-10", freq="D")
+    values = np.full(len(dates), 20.0)
+    values[1:6] = 35.0   # 30/12 -> 03/01 : compté en 2000
+    values[7:9] = 35.0
+    values[9] = np.nan   # coupe la plage du 05/01 (2 jours seulement)
+    values[10:12] = 35.0
+
+    got = detect_episodes(values, dates, seuil=30, min_len=3)
+    np.testing.assert_array_equal(got["years"], [2000, 2001])
+    np.testing.assert_array_equal(got["count"][:, 0], [1, 0])
+    np.testing.assert_array_equal(got["longest"][:, 0], [5, 0])
+    np.testing.assert_allclose(got["degree_days"][:, 0], [25.0, 0.0])
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import reference_city_series
+from utils import extraction
+from utils.extraction import city_entry, extract_city_data, extract_many_cities
+
+
+@pytest.mark.parametrize("ville", ["Alpha", "Beta", "Cote"])
+def test_extract_city_data_matches_window_mean(cube, villes, ville):
+    row = villes.set_index("label").loc[ville]
+    expected = reference_city_series(cube, row["lat"], row["lon"])
+    got = extract_city_data(cube, villes, ville)["temp"]
+    pd.testing.assert_series_equal(got, expected, check_names=False, rtol=1e-6)
+    assert got.notna().all()  # "Cote" est en mer à ±0.25° : fenêtre élargie
+
+
+@pytest.mark.parametrize("processes", [False, True])
+def test_extract_many_cities_matches_single_extraction(cube, villes, processes):
+    done = []
+    series, timings = extract_many_cities(cube, villes, ["Alpha", "Cote", "Alpha"], processes=processes,
+                                          on_done=lambda v, s: done.append(v))
+    assert sorted(series) == sorted(timings) == sorted(done) == ["Alpha", "Cote"]
+    for ville, df in series.items():
+        row = villes.set_index("label").loc[ville]
+        np.testing.assert_allclose(df["temp"].values, reference_city_series(cube, row["lat"], row["lon"]).values,
+                                   rtol=1e-6)
+
+
+def test_extract_many_cities_reports_unknown_city_as_empty(cube, villes):
+    series, _ = extract_many_cities(cube, villes, ["Inconnue"])
+    assert series["Inconnue"].empty
+
+
+def test_extract_many_cities_defaults_to_threads(cube, villes, monkeypatch):
+    monkeypatch.setattr(extraction, "USE_PROCESSES", False)
+    monkeypatch.setattr(extraction, "get_process_executor", lambda *a: pytest.fail("pool de processus créé"))
+    series, _ = extract_many_cities(cube, villes, ["Beta"])
+    assert not series["Beta"].empty
+
+
+def test_city_entry_warm_only_and_derived(cube, villes):
+    cube = cube.isel(time=slice(0, 400))  # dataset distinct : cache par ville vide
+    cube.encoding["source"] = "synthetique-warm"
+    assert city_entry(cube, villes, "Beta", warm_only=True) is None
+
+    entry = city_entry(cube, villes, "Beta")
+    assert city_entry(cube, villes, "Beta", warm_only=True) is entry
+    builds = []
+    first = entry.derived("annuel", lambda temp: builds.append(1) or temp.resample("YE").mean())
+    assert entry.derived("annuel", lambda temp: builds.append(2)) is first
+    assert builds == [1]
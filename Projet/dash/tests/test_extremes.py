@@ -0,0 +1,92 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import genextreme
+
+from conftest import make_cube
+from utils import extremes
+from utils.extremes import _fit_chunk, annual_maxima, build_return_levels, city_return_level, load_return_levels
+
+
+@pytest.fixture
+def fichiers(tmp_path, monkeypatch):
+    """ Table et checkpoints redirigés vers un dossier temporaire """
+    monkeypatch.setattr(extremes, "CHEMIN_NIVEAUX", tmp_path / "niveaux_retour.parquet")
+    monkeypatch.setattr(extremes, "DIR_PARTIEL", tmp_path / "partiel")
+    extremes._read_return_levels.cache_clear()
+    return tmp_path
+
+
+@pytest.mark.parametrize("years_per_read", [10, 3])
+def test_annual_maxima_match_resample(cube, years_per_read):
+    years, maxima = annual_maxima(cube, years_per_read)
+    expected = cube["temp_c"].resample(time="YE").max()
+    np.testing.assert_array_equal(years, np.arange(1950, 1960))
+    np.testing.assert_array_equal(maxima, expected.values)
+
+
+def test_fit_chunk_matches_genextreme():
+    rng = np.random.default_rng(6)
+    maxima = genextreme.rvs(0.1, loc=35, scale=2, size=(3, 30), random_state=rng)
+    maxima[1, :15] = np.nan  # trop peu d'années pour un ajustement
+    out, n_years = _fit_chunk(maxima, periode=50, n_boot=0, seed=0)
+
+    np.testing.assert_array_equal(n_years, [30, 15, 30])
+    for k in (0, 2):
+        expected = genextreme.isf(1 / 50, *genextreme.fit(maxima[k]))
+        assert out[k, 0] == pytest.approx(expected)
+    assert np.isnan(out[1]).all() and np.isnan(out[:, 1:]).all()
+
+
+def test_fit_chunk_bootstrap_brackets_level():
+    maxima = genextreme.rvs(0.1, loc=35, scale=2, size=(1, 40), random_state=np.random.default_rng(7))
+    out, _ = _fit_chunk(maxima, periode=20, n_boot=20, seed=1)
+    assert out[0, 1] <= out[0, 0] <= out[0, 2]
+
+
+def test_city_return_level_window_mean(cube, fichiers):
+    assert city_return_level(cube, 45.1, 2.2) is None  # table absente (non mise en cache)
+
+    lat_idx, lon_idx = np.meshgrid(np.arange(cube.sizes["lat"]), np.arange(cube.sizes["lon"]), indexing="ij")
+    table = pd.DataFrame({"lat_idx": lat_idx.ravel(), "lon_idx": lon_idx.ravel(),
+                          "niveau": np.arange(lat_idx.size, dtype=float), "ic_bas": 0.0, "ic_haut": 1.0,
+                          "n_annees": 30, "periode": 50})
+    table.loc[(table["lat_idx"] < 3) & (table["lon_idx"] < 3), ["niveau", "ic_bas", "ic_haut"]] = np.nan  # mer
+    table.to_parquet(extremes.CHEMIN_NIVEAUX, index=False)
+
+    for lat, lon, offset in [(45.1, 2.2, 0.25), (44.1, 1.1, 0.8)]:
+        got = city_return_level(cube, lat, lon)
+        near = table[(np.abs(cube["lat"].values[table["lat_idx"]] - lat) <= offset)
+                     & (np.abs(cube["lon"].values[table["lon_idx"]] - lon) <= offset)].dropna()
+        assert got["niveau"] == pytest.approx(near["niveau"].mean())
+        assert got["n_cellules"] == len(near)
+
+    # Table regénérée : relue sans redémarrage
+    table["niveau"] += 100
+    table.to_parquet(extremes.CHEMIN_NIVEAUX, index=False)
+    os.utime(extremes.CHEMIN_NIVEAUX, (1e9, 1e9))
+    assert load_return_levels()["niveau"].min() == table["niveau"].min()
+
+
+def test_build_return_levels_resumes_from_checkpoints(fichiers):
+    ds = make_cube(start="1950-01-01", end="1974-12-31", lat=(45.0, 46.0), lon=(3.0, 3.5))  # 6 cellules terrestres
+    first = build_return_levels(ds, periode=50, n_boot=0, workers=1, chunk_cells=2)
+    lots = sorted(extremes.DIR_PARTIEL.glob("lot_*.parquet"))
+    assert len(lots) == 3 and len(first) == 6 and first["niveau"].notna().all()
+
+    # Reprise : seuls les lots absents sont recalculés
+    stamps = {f: f.stat().st_mtime_ns for f in lots}
+    lots[1].unlink()
+    (extremes.DIR_PARTIEL / "lot_00001.tmp").write_bytes(b"tronque")
+    again = build_return_levels(ds, periode=50, n_boot=0, workers=1, chunk_cells=2)
+    pd.testing.assert_frame_equal(again, first)
+    assert lots[0].stat().st_mtime_ns == stamps[lots[0]] and lots[2].stat().st_mtime_ns == stamps[lots[2]]
+
+    # Autre paramétrage : les lots (et les fichiers temporaires) sont effacés
+    build_return_levels(ds, periode=20, n_boot=0, workers=1, chunk_cells=2)
+    assert lots[0].stat().st_mtime_ns != stamps[lots[0]]
+    assert not list(extremes.DIR_PARTIEL.glob("lot_*.tmp"))
+    assert json.loads((extremes.DIR_PARTIEL / "meta.json").read_text())["periode"] == 20
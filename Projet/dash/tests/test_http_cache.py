@@ -0,0 +1,71 @@
+import gzip
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from flask import Flask
+
+from conftest import reference_city_series
+from utils import http_cache
+from utils.coalescing import MemoryLRU
+
+
+@pytest.fixture
+def client(cube, villes, monkeypatch):
+    cube.encoding["source"] = "synthetique-http"  # cache par ville propre à ce test
+    monde = pd.DataFrame({"Country": ["France", "France", "France", "Chili", "Chili"],
+                          "Annee": [2000, 2000, 2001, 2000, 2001],
+                          "AverageTemperature": [10.0, 12.0, 13.5, 8.0, np.nan]})
+    monkeypatch.setattr(http_cache, "load_all_data", lambda: (cube, None, villes))
+    monkeypatch.setattr(http_cache, "load_world_data", lambda: monde)
+    monkeypatch.setattr(http_cache, "_payloads", MemoryLRU())
+    monkeypatch.setattr(http_cache, "_compressed", MemoryLRU())
+
+    app = Flask(__name__)
+    app.add_url_rule("/_dash-layout", "layout", lambda: "x" * 2000)
+    app.add_url_rule("/petit", "petit", lambda: "x" * 2000)
+    http_cache.init_http_cache(app)
+    return app.test_client()
+
+
+def test_gzip_round_trip_on_dash_routes_only(client):
+    response = client.get("/_dash-layout", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.data) == b"x" * 2000
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+    assert "Content-Encoding" not in client.get("/_dash-layout").headers  # pas d'Accept-Encoding
+    assert "Content-Encoding" not in client.get("/petit", headers={"Accept-Encoding": "gzip"}).headers
+
+
+def test_city_annual_matches_resample(client, cube, villes):
+    response = client.get("/data/ville/Alpha/annuel.json")
+    assert response.status_code == 200
+    payload = json.loads(response.data)
+    expected = reference_city_series(cube, villes["lat"][0], villes["lon"][0]).resample("YE").mean()
+    assert payload["annees"] == list(expected.index.year)
+    np.testing.assert_allclose(payload["moyenne"], expected.round(2).values, atol=0.011)
+
+    assert client.get("/data/ville/Inconnue/annuel.json").status_code == 404
+
+
+def test_etag_revalidation_and_versioned_url(client):
+    first = client.get("/data/ville/Beta/annuel.json")
+    etag = first.get_etag()[0]
+    assert "immutable" not in first.headers["Cache-Control"]
+
+    # ETag faible après compression : la comparaison reste faible
+    for header in (f'"{etag}"', f'W/"{etag}"'):
+        again = client.get("/data/ville/Beta/annuel.json", headers={"If-None-Match": header})
+        assert again.status_code == 304 and not again.data
+
+    versioned = client.get(f"/data/ville/Beta/annuel.json?v={etag}")
+    assert "immutable" in versioned.headers["Cache-Control"]
+    assert versioned.get_etag()[0] == etag
+
+
+def test_country_matrix_matches_groupby(client):
+    payload = json.loads(client.get("/data/pays/matrice.json").data)
+    assert payload == {"pays": ["Chili", "France"], "annees": [2000, 2001],
+                       "valeurs": [[8.0, None], [11.0, 13.5]]}
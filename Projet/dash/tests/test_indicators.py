@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import reference_city_series
+from utils.indicators import (annual_city_stats, compute_city_indicators, elu_summary, iter_bands,
+                              iter_city_indicators)
+
+
+@pytest.fixture
+def communes(cube, villes):
+    """ Villes fixes + points tirés dans le cube (fenêtres partagées, bords, mer) """
+    rng = np.random.default_rng(1)
+    n = 40
+    tirage = pd.DataFrame({"label": [f"C{k}" for k in range(n)], "lat": rng.uniform(44.0, 46.0, n),
+                           "lon": rng.uniform(1.0, 3.5, n), "Region_Assignee": "Tirage"})
+    return pd.concat([villes, tirage], ignore_index=True)
+
+
+def reference_annual(cube, lat, lon, seuil, seuil_gel):
+    """ Statistiques annuelles d'une ville avec pandas (série extraite puis resample) """
+    temp = reference_city_series(cube, lat, lon)
+    yearly = temp.resample("YE")
+    return pd.DataFrame({"mean": yearly.mean(), "hot": (temp > seuil).resample("YE").sum(),
+                         "cold": (temp < seuil_gel).resample("YE").sum(),
+                         "summer": (temp > 25).resample("YE").sum()}), temp
+
+
+@pytest.mark.parametrize("years_per_read", [None, 3])
+def test_annual_city_stats_match_pandas(cube, communes, years_per_read):
+    st = annual_city_stats(cube, communes["lat"], communes["lon"], seuil=20, seuil_gel=0, years_per_read=years_per_read)
+    np.testing.assert_array_equal(st["years"], np.arange(1950, 1960))
+
+    for k, row in communes.iterrows():
+        expected, temp = reference_annual(cube, row["lat"], row["lon"], 20, 0)
+        np.testing.assert_allclose(st["mean"][:, k], expected["mean"].values, atol=1e-3)
+        # Comptes au seuil : un arrondi float32 peut faire basculer un jour isolé
+        for name in ("hot", "cold", "summer"):
+            assert np.abs(st[name][:, k] - expected[name].values).max() <= 1, name
+        assert st["record"][k] == pytest.approx(temp.max(), abs=1e-3)
+        assert st["record_date"][k] == temp.idxmax()
+
+
+def test_compute_city_indicators_match_page_formulas(cube, villes):
+    table = compute_city_indicators(cube, villes, seuil=20, seuil_gel=0)
+    assert list(table["label"]) == list(villes["label"])
+    for k, row in villes.iterrows():
+        temp = reference_city_series(cube, row["lat"], row["lon"])
+        annuel = temp.resample("YE").mean()
+        assert table["moyenne_annuelle"][k] == pytest.approx(annuel.mean(), abs=0.011)
+        assert table["delta_75ans"][k] == pytest.approx(annuel.iloc[-5:].mean() - annuel.iloc[:5].mean(), abs=0.011)
+        gel = (temp < 0).resample("YE").sum()
+        assert table["jours_gel_moy"][k] == pytest.approx(gel.mean(), abs=0.15)
+        assert table["jours_gel_recent"][k] == pytest.approx(gel.iloc[-5:].mean(), abs=0.25)
+
+
+def test_iter_city_indicators_equals_single_pass(cube, communes):
+    single = compute_city_indicators(cube, communes).set_index("label")
+    chunks = list(iter_city_indicators(cube, communes, chunk_rows=7, band_rows=2))
+    assert max(len(c) for c in chunks) <= 7
+    streamed = pd.concat(chunks).set_index("label")
+
+    assert sorted(streamed.index) == sorted(single.index)
+    streamed = streamed.loc[single.index]
+    # Sous-cubes différents : seuls les arrondis à 0.01 peuvent différer
+    numeric = single.select_dtypes("number").columns
+    np.testing.assert_allclose(streamed[numeric].values, single[numeric].values, atol=0.011)
+    assert (streamed["date_record"] == single["date_record"]).all()
+
+
+def test_iter_bands_covers_every_commune_once(cube, communes):
+    bands = list(iter_bands(cube, communes, band_rows=3))
+    assert len(bands) > 1
+    assert sorted(pd.concat(bands)["label"]) == sorted(communes["label"])
+
+
+def test_elu_summary_matches_page_formulas(cube, villes):
+    # Seuil bas : chaque année a des jours chauds (la formule d'origine comptait par resample)
+    temp = reference_city_series(cube, villes["lat"][0], villes["lon"][0])
+    resume = elu_summary(temp, seuil=20)
+
+    ts_ville = temp.to_frame("temp")
+    annuel = ts_ville.resample("YE")["temp"].mean()
+    jours_ete = ts_ville[ts_ville["temp"] > 25].resample("YE")["temp"].count()
+    assert resume["delta"] == pytest.approx(annuel.iloc[-5:].mean() - annuel.iloc[:5].mean())
+    assert resume["jours_chauds_recent"] == int(ts_ville[ts_ville["temp"] > 20].resample("YE")["temp"].count().iloc[-5:].mean())
+    assert resume["gain_ete"] == int(jours_ete.iloc[-10:].mean() - jours_ete.iloc[:10].mean())
+    assert resume["record"] == temp.max()
+    assert resume["annee_record"] == temp.idxmax().year
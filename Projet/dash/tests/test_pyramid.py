@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.pyramid import DEFAULT_PIXEL_WIDTH, build_pyramid, relayout_range, select_level, zoom_width
+
+
+@pytest.fixture
+def series():
+    index = pd.date_range("1950-01-01", "1969-12-31", freq="D")
+    values = np.random.default_rng(2).normal(12, 6, len(index))
+    values[100:140] = np.nan
+    return pd.Series(values, index=index)
+
+
+def test_levels_match_resample(series):
+    pyramid = build_pyramid(series)
+    pd.testing.assert_series_equal(pyramid["D"], series.dropna())
+    pd.testing.assert_series_equal(pyramid["W"], series.resample("W-MON").mean().dropna())
+    pd.testing.assert_series_equal(pyramid["ME"], series.resample("ME").mean().dropna())
+    pd.testing.assert_series_equal(pyramid["YE"], series.resample("YE").mean().dropna())
+
+
+@pytest.mark.parametrize("start, end, width, level", [
+    ("1950-01-01", "1969-12-31", 20, "YE"),   # 20 ans, 20 pixels : annuel
+    ("1950-01-01", "1969-12-31", 200, "ME"),  # 240 mois
+    ("1950-01-01", "1969-12-31", 900, "W"),   # ~1 040 semaines
+    ("1960-01-01", "1960-12-31", 900, "D"),   # 366 jours : rien de plus grossier ne suffit
+])
+def test_select_level_picks_coarsest_filling_level(series, start, end, width, level):
+    pyramid = build_pyramid(series)
+    got_level, window = select_level(pyramid, start, end, width)
+    assert got_level == level
+    pd.testing.assert_series_equal(window, pyramid[level].loc[start:end])
+
+
+def test_select_level_uses_real_width(series):
+    pyramid = build_pyramid(series)
+    narrow, _ = select_level(pyramid, "1950-01-01", "1969-12-31", zoom_width({"largeur": 150}))
+    wide, _ = select_level(pyramid, "1950-01-01", "1969-12-31", zoom_width({"largeur": 1200}))
+    assert (narrow, wide) == ("ME", "D")
+
+
+@pytest.mark.parametrize("zoom, width", [
+    (None, DEFAULT_PIXEL_WIDTH), ({}, DEFAULT_PIXEL_WIDTH), ({"largeur": None}, DEFAULT_PIXEL_WIDTH),
+    ({"largeur": 0}, DEFAULT_PIXEL_WIDTH), ({"largeur": 612.4}, 612),
+])
+def test_zoom_width(zoom, width):
+    assert zoom_width(zoom) == width
+
+
+@pytest.mark.parametrize("relayout, expected", [
+    (None, None),
+    ({"xaxis.autorange": True}, "auto"),
+    ({"xaxis.range[0]": "1960-01-01", "xaxis.range[1]": "1961-01-01"}, ("1960-01-01", "1961-01-01")),
+    ({"xaxis.range": ["1960-01-01", "1961-01-01"]}, ("1960-01-01", "1961-01-01")),
+    ({"yaxis.range[0]": 0, "yaxis.range[1]": 1}, None),
+])
+def test_relayout_range(relayout, expected):
+    assert relayout_range(relayout) == expected
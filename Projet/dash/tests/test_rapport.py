@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+
+from conftest import reference_city_series
+from utils import rapport
+from utils.indicators import elu_summary
+from utils.rapport import SUFFIXE_VIDE, generate_reports, report_files
+
+
+@pytest.fixture
+def communes(villes):
+    """ Villes du cube + un homonyme d'Alpha, un doublon exact et une commune hors grille """
+    extra = pd.DataFrame({"label": ["Alpha", "Alpha", "Large"], "lat": [45.6, 45.1, 60.0], "lon": [2.0, 2.2, 10.0],
+                          "Region_Assignee": "Nord"})
+    return pd.concat([villes, extra], ignore_index=True)
+
+
+def test_report_files_suffixes_homonyms():
+    communes = pd.DataFrame({"label": ["Sainte Marie", "Sainte-Marie", "Paris", "Sainte-Marie"],
+                             "lat": [45.0, 44.0, 48.8, 43.0], "lon": [1.0, 1.0, 2.3, 1.0]}, index=[10, 11, 12, 13])
+    files = report_files(communes)
+    assert list(files.index) == [10, 11, 12, 13]
+    assert files[12] == "paris.html"
+    assert sorted(files[[10, 11, 13]]) == ["sainte_marie.html", "sainte_marie_2.html", "sainte_marie_3.html"]
+    pd.testing.assert_series_equal(report_files(communes.iloc[::-1]), files.iloc[::-1])  # stable
+
+
+def test_generate_reports_matches_elu_summary_and_resumes(cube, communes, tmp_path, monkeypatch):
+    monkeypatch.setattr(rapport, "DIR_RAPPORTS", tmp_path)
+    progres = []
+    bilan = generate_reports(cube, communes, "Nord", seuil=20, workers=1, chunk_rows=2,
+                             on_progress=lambda fait, total: progres.append((fait, total)))
+
+    assert bilan["total"] == 5 and bilan["generes"] == 4 and bilan["sans_donnees"] == 1
+    assert progres[0] == (0, 5) and progres[-1] == (5, 5)
+    out = tmp_path / "nord_seuil20"
+    assert (out / "large.html").with_suffix(SUFFIXE_VIDE).exists()
+    assert sorted(p.name for p in out.glob("*.html")) == ["alpha.html", "alpha_2.html", "beta.html", "cote.html",
+                                                          "index.html"]
+
+    # Contenu : même résumé que la carte "Mode Élu" calculée sur la série de la ville
+    temp = reference_city_series(cube, 45.6, 3.0)
+    resume = elu_summary(temp, seuil=20)
+    page = (out / "beta.html").read_text(encoding="utf-8")
+    assert f"{resume['delta']:+.1f}°C" in page
+    assert f">{int(resume['jours_chauds_recent'])}<" in page
+    assert f"{int(resume['gain_ete']):+d} jours" in page
+    assert f"{resume['record']:.1f}°C ({int(resume['annee_record'])})" in page
+
+    # Reprise : rien à refaire, marqueur compris
+    again = generate_reports(cube, communes, "Nord", seuil=20, workers=1)
+    assert again["deja_faits"] == 5 and again["generes"] == 0
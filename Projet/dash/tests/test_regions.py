@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from utils.regions import TOUTES_REGIONS, compute_region_series
+
+
+def make_weights(cube, lat=None, lon=None):
+    """ Deux régions : bande nord (poids 1) et bande sud à poids fractionnaires, NaN hors région """
+    lat = cube["lat"].values if lat is None else lat
+    lon = cube["lon"].values if lon is None else lon
+    nord = np.where(lat[:, None] >= 45.0, 1.0, np.nan) * np.ones(len(lon))
+    sud = np.where(lat[:, None] < 45.0, 0.5, np.nan) * np.linspace(0.2, 1.0, len(lon))
+    return xr.Dataset({"weights": (("region", "lat", "lon"), np.stack([nord, sud]))},
+                      coords={"region": ["Nord", "Sud"], "lat": lat, "lon": lon})
+
+
+def reference(cube, ds_poids):
+    """ Calcul région par région, comme avant la matrice creuse """
+    temp = cube["temp_c"]
+    out = {TOUTES_REGIONS: temp.mean(["lat", "lon"]).to_series()}
+    for region in ds_poids["region"].values:
+        w = ds_poids["weights"].sel(region=region).fillna(0)
+        out[str(region)] = ((temp.fillna(0) * w).sum(["lat", "lon"]) / w.sum()).to_series()
+    return pd.DataFrame(out)
+
+
+@pytest.mark.parametrize("days_per_chunk", [1825, 100, 7])
+def test_region_series_match_weighted_mean(cube, days_per_chunk):
+    poids = make_weights(cube)
+    got = compute_region_series(cube, poids, days_per_chunk=days_per_chunk)
+    pd.testing.assert_frame_equal(got, reference(cube, poids), check_names=False, check_freq=False, check_dtype=False,
+                                  rtol=1e-5)
+
+
+def test_region_series_on_a_sub_grid(cube):
+    # Poids sur une partie de la grille seulement : alignement sur les cellules communes
+    poids = make_weights(cube, lat=cube["lat"].values[2:-1], lon=cube["lon"].values[1:])
+    got = compute_region_series(cube, poids, days_per_chunk=365)
+    expected = reference(cube.sel(lat=poids["lat"], lon=poids["lon"]), poids)
+    np.testing.assert_allclose(got[["Nord", "Sud"]].values, expected[["Nord", "Sud"]].values, rtol=1e-5)
+    np.testing.assert_allclose(got[TOUTES_REGIONS].values, cube["temp_c"].mean(["lat", "lon"]).values, rtol=1e-5)
+
+
+def test_region_series_without_weights(cube):
+    got = compute_region_series(cube, xr.Dataset())
+    assert list(got.columns) == [TOUTES_REGIONS]
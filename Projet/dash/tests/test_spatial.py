@@ -0,0 +1,94 @@
+import struct
+
+import numpy as np
+import pytest
+
+from utils.spatial import CHAMP_NOM, PolygonIndex, _projection, assign_regions, region_weights
+
+# Carré 0..10 percé d'un trou 4..6, et triangle (12,0) (20,0) (16,8)
+CARRE = np.array([[0, 0], [0, 10], [10, 10], [10, 0]], dtype=float)
+TROU = np.array([[4, 4], [6, 4], [6, 6], [4, 6]], dtype=float)
+TRIANGLE = np.array([[12, 0], [16, 8], [20, 0]], dtype=float)
+
+LAMBERT_93 = ('PROJCS["RGF_1993_Lambert_93",GEOGCS["GCS_RGF_1993",DATUM["D_RGF_1993",'
+              'SPHEROID["GRS_1980",6378137.0,298.257222101]],PRIMEM["Greenwich",0.0],'
+              'UNIT["Degree",0.0174532925199433]],PROJECTION["Lambert_Conformal_Conic"],'
+              'PARAMETER["False_Easting",700000.0],PARAMETER["False_Northing",6600000.0],'
+              'PARAMETER["Central_Meridian",3.0],PARAMETER["Standard_Parallel_1",49.0],'
+              'PARAMETER["Standard_Parallel_2",44.0],PARAMETER["Latitude_Of_Origin",46.5],UNIT["Meter",1.0]]')
+
+
+def expected_owner(x, y):
+    """ Réponse analytique pour les deux polygones de test """
+    in_square = (x > 0) & (x < 10) & (y > 0) & (y < 10) & ~((x > 4) & (x < 6) & (y > 4) & (y < 6))
+    in_triangle = (y > 0) & (y < 2 * (x - 12)) & (y < 2 * (20 - x))
+    return np.where(in_square, 0, np.where(in_triangle, 1, -1))
+
+
+@pytest.mark.parametrize("n_bands", [1, 7, 1024])
+def test_polygon_index_with_hole(n_bands):
+    rng = np.random.default_rng(8)
+    x, y = rng.uniform(-2, 22, 20_000), rng.uniform(-2, 12, 20_000)
+    got = PolygonIndex([[CARRE, TROU], [TRIANGLE]], n_bands=n_bands).locate(x, y)
+    np.testing.assert_array_equal(got, expected_owner(x, y))
+    assert (got == -1).any() and (got == 0).any() and (got == 1).any()
+
+
+def test_polygon_index_without_polygons():
+    np.testing.assert_array_equal(PolygonIndex([]).locate([1.0], [1.0]), [-1])
+
+
+def test_lambert_93_projection():
+    project = _projection(LAMBERT_93)
+    x, y = project(3.0, 46.5)
+    assert (x, y) == (pytest.approx(700000, abs=1e-3), pytest.approx(6600000, abs=1e-3))
+    assert project(3.0, 49.0)[0] == pytest.approx(700000)
+
+    # Parallèle standard : facteur d'échelle 1 (longueur d'un petit arc de parallèle conservée)
+    a, f = 6378137.0, 1 / 298.257222101
+    e2, phi, dlon = 2 * f - f * f, np.radians(49.0), 0.001
+    arc = a * np.cos(phi) / np.sqrt(1 - e2 * np.sin(phi) ** 2) * np.radians(dlon)
+    x0, y0 = project(3.0, 49.0)
+    x1, y1 = project(3.0 + dlon, 49.0)
+    assert np.hypot(x1 - x0, y1 - y0) == pytest.approx(arc, rel=1e-6)
+
+
+def test_geographic_projection_is_identity():
+    x, y = _projection("")([1.5, 2.5], [45.0, 46.0])
+    np.testing.assert_array_equal(x, [1.5, 2.5])
+    np.testing.assert_array_equal(y, [45.0, 46.0])
+
+
+def write_shapefile(path, names, polygons):
+    """ Shapefile polygone minimal (.shp + .dbf, coordonnées géographiques) """
+    records = b""
+    for k, rings in enumerate(polygons, start=1):
+        points = np.vstack(rings)
+        parts = np.cumsum([0] + [len(r) for r in rings[:-1]])
+        content = (struct.pack("<i4d2i", 5, *points.min(axis=0), *points.max(axis=0), len(rings), len(points))
+                   + parts.astype("<i4").tobytes() + points.astype("<f8").tobytes())
+        records += struct.pack(">2i", k, len(content) // 2) + content
+    header = struct.pack(">7i", 9994, 0, 0, 0, 0, 0, (100 + len(records)) // 2) + struct.pack("<2i", 1000, 5)
+    path.write_bytes(header + bytes(100 - len(header)) + records)
+
+    width = 20
+    field = CHAMP_NOM.encode().ljust(11, b"\x00") + b"C" + bytes(4) + bytes([width, 0]) + bytes(14)
+    dbf = struct.pack("<4BIHH", 3, 126, 1, 1, len(names), 32 + 32 + 1, 1 + width) + bytes(20) + field + b"\x0d"
+    dbf += b"".join(b" " + n.encode().ljust(width) for n in names) + b"\x1a"
+    path.with_suffix(".dbf").write_bytes(dbf)
+
+
+def test_assign_regions_and_weights_from_shapefile(tmp_path):
+    shp = tmp_path / "region.shp"
+    write_shapefile(shp, ["Carre", "Triangle"], [[CARRE, TROU], [TRIANGLE]])
+
+    lons, lats = np.array([1.0, 5.0, 16.0, 30.0]), np.array([1.0, 5.0, 2.0, 1.0])
+    assert list(assign_regions(lats, lons, shp)) == ["Carre", None, "Triangle", None]
+
+    lat, lon = np.arange(0.5, 12, 1.0), np.arange(0.5, 22, 1.0)
+    poids = region_weights(lat, lon, shp)
+    assert list(poids["region"].values) == ["Carre", "Triangle"]
+    grid_lon, grid_lat = np.meshgrid(lon, lat)
+    owner = expected_owner(grid_lon, grid_lat)
+    np.testing.assert_array_equal(poids["weights"].sel(region="Carre").values, owner == 0)
+    np.testing.assert_array_equal(poids["weights"].sel(region="Triangle").values, owner == 1)
@@ -0,0 +1,79 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from utils.trends import mann_kendall_sen, ols_trend, trend_table
+
+
+@pytest.fixture
+def annual():
+    """ Séries annuelles : tendance + bruit, valeurs arrondies (ex-aequo) et années manquantes """
+    rng = np.random.default_rng(5)
+    years = np.arange(1950, 1990)
+    values = 0.02 * (years - 1950) + rng.normal(0, 0.5, (30, len(years)))
+    values[::3] = values[::3].round(1)
+    values[rng.random(values.shape) < 0.1] = np.nan
+    values[-1, 2:] = np.nan  # 2 années seulement
+    return pd.DataFrame(values, columns=years)
+
+
+def reference_mk(y, x):
+    """ Mann-Kendall + Sen directs, en O(n²) sur les paires valides """
+    keep = ~np.isnan(y)
+    y, x = y[keep], x[keep]
+    n = len(y)
+    s, slopes = 0.0, []
+    for i in range(n):
+        for j in range(i + 1, n):
+            s += np.sign(y[j] - y[i])
+            slopes.append((y[j] - y[i]) / (x[j] - x[i]))
+    _, ties = np.unique(y, return_counts=True)
+    var_s = (n * (n - 1) * (2 * n + 5) - (ties * (ties - 1) * (2 * ties + 5)).sum()) / 18
+    z = (s - np.sign(s)) / np.sqrt(var_s)
+    return s, z, 2 * stats.norm.sf(abs(z)), np.median(slopes)
+
+
+def test_ols_matches_linregress(annual):
+    x = annual.columns.values
+    got = ols_trend(annual.values, x, alpha=0.1)
+    for k, y in enumerate(annual.values[:-1]):
+        keep = ~np.isnan(y)
+        ref = stats.linregress(x[keep], y[keep])
+        assert got["slope"][k] == pytest.approx(ref.slope)
+        assert got["intercept"][k] == pytest.approx(ref.intercept)
+        assert got["stderr"][k] == pytest.approx(ref.stderr)
+        assert got["p_value"][k] == pytest.approx(ref.pvalue)
+        half = stats.t.ppf(0.95, keep.sum() - 2) * ref.stderr
+        assert got["ci_low"][k] == pytest.approx(ref.slope - half)
+        assert got["ci_high"][k] == pytest.approx(ref.slope + half)
+
+
+def test_ols_masks_short_series(annual):
+    got = ols_trend(annual.values, annual.columns.values)
+    assert got["n"][-1] == 2
+    for name in ("slope", "intercept", "stderr", "ci_low", "ci_high", "p_value"):
+        assert np.isnan(got[name][-1]), name
+
+
+def test_mann_kendall_sen_matches_pairwise_loop(annual):
+    x = annual.columns.values.astype(float)
+    got = mann_kendall_sen(annual.values, x)
+    for k, y in enumerate(annual.values[:-1]):
+        s, z, p, sen = reference_mk(y, x)
+        assert got["s"][k] == s
+        assert got["z"][k] == pytest.approx(z)
+        assert got["p_value"][k] == pytest.approx(p)
+        assert got["sen_slope"][k] == pytest.approx(sen)
+    assert np.isnan(got["z"][-1])
+
+
+@pytest.mark.parametrize("executor", [None, ThreadPoolExecutor(2)])
+def test_trend_table_chunked_equals_single_chunk(annual, executor):
+    single = trend_table(annual, chunk_rows=len(annual))
+    chunked = trend_table(annual, chunk_rows=7, executor=executor)
+    pd.testing.assert_frame_equal(chunked, single)
+    assert list(single.columns) == ["pente_ols", "ic_bas", "ic_haut", "p_ols", "mk_s", "mk_z", "p_mk",
+                                    "pente_sen", "n_annees"]
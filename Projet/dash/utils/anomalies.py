@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+from utils.coalescing import MemoryLRU
+from utils.extraction import city_entry, region_table
+from utils.regions import TOUTES_REGIONS
+
+_stats = MemoryLRU(maxsize=32)  # régions (les villes passent par le cache par ville)
+
+
+class CumulativeStats:
+    """
+    Sommes cumulées annuelles et mensuelles d'une série journalière.
+
+    Construites en un seul passage sur les données journalières ; ensuite la
+    moyenne de n'importe quelle période [début, fin] s'obtient par différence de
+    deux sommes cumulées (temps constant), sans relire la série :
+      - période annuelle : moyenne des moyennes annuelles (comme resample('YE').mean())
+      - période mensuelle : moyenne des jours de chaque mois sur la période
+    """
+
+    def __init__(self, series):
+        series = series.dropna()
+        self.years = np.arange(series.index.year.min(), series.index.year.max() + 1)
+        n_years = len(self.years)
+
+        # Sommes / effectifs par (année, mois)
+        grouped = series.groupby([series.index.year, series.index.month])
+        sums, counts = grouped.sum(), grouped.count()
+        y_idx = sums.index.get_level_values(0) - self.years[0]
+        m_idx = sums.index.get_level_values(1) - 1
+        month_sum, month_count = np.zeros((n_years, 12)), np.zeros((n_years, 12))
+        month_sum[y_idx, m_idx] = sums.values
+        month_count[y_idx, m_idx] = counts.values
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.monthly_mean = np.where(month_count > 0, month_sum / month_count, np.nan)
+            year_count = month_count.sum(axis=1)
+            self.annual_mean = np.where(year_count > 0, month_sum.sum(axis=1) / year_count, np.nan)
+
+        # Sommes cumulées (ligne 0 = 0) : somme sur [i, j[ = cum[j] - cum[i]
+        has_year = ~np.isnan(self.annual_mean)
+        self._cum_annual = np.concatenate([[0.0], np.cumsum(np.where(has_year, self.annual_mean, 0.0))])
+        self._cum_years = np.concatenate([[0], np.cumsum(has_year)])
+        self._cum_month_sum = np.vstack([np.zeros(12), np.cumsum(month_sum, axis=0)])
+        self._cum_month_count = np.vstack([np.zeros(12), np.cumsum(month_count, axis=0)])
+
+    def _bounds(self, start, end):
+        i = int(np.clip(start - self.years[0], 0, len(self.years)))
+        j = int(np.clip(end - self.years[0] + 1, i, len(self.years)))
+        return i, j
+
+    def period_mean(self, start, end):
+        """ Moyenne des moyennes annuelles sur [start, end] (années incluses) """
+        i, j = self._bounds(start, end)
+        n = self._cum_years[j] - self._cum_years[i]
+        return (self._cum_annual[j] - self._cum_annual[i]) / n if n else np.nan
+
+    def monthly_baseline(self, start, end):
+        """ Moyenne journalière de chaque mois (12 valeurs) sur [start, end] """
+        i, j = self._bounds(start, end)
+        n = self._cum_month_count[j] - self._cum_month_count[i]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(n > 0, (self._cum_month_sum[j] - self._cum_month_sum[i]) / n, np.nan)
+
+    def annual_anomaly(self, start, end):
+        """ Écart de chaque année à la période de référence (Series indexée par année) """
+        return pd.Series(self.annual_mean - self.period_mean(start, end), index=self.years)
+
+    def monthly_anomaly(self, start, end):
+        """ Écart mensuel (années × mois) à la climatologie de la période de référence """
+        return pd.DataFrame(self.monthly_mean - self.monthly_baseline(start, end),
+                            index=pd.Index(self.years, name='Year'), columns=pd.Index(range(1, 13), name='Mois'))
+
+    def delta(self, periode_a, periode_b):
+        """ Écart de température moyenne entre la période B et la période A """
+        return self.period_mean(*periode_b) - self.period_mean(*periode_a)
+
+
+def city_stats(ds, df_villes, ville_name, warm_only=False):
+    """ Sommes cumulées d'une ville (cache par ville) ; None si warm_only et la série n'est pas extraite """
+    entry = city_entry(ds, df_villes, ville_name, warm_only)
+    return None if entry is None else entry.derived('stats', CumulativeStats)
+
+
+def region_stats(ds, ds_poids, region, warm_only=False):
+    """ Sommes cumulées d'une région, à partir du tableau de toutes les régions """
+    stats = _stats.get(("region", region))
+    if stats is None:
+        table = region_table(ds, ds_poids, warm_only)
+        if table is None:
+            return None
+        stats = _stats.put(("region", region), CumulativeStats(table[region if region in table.columns else TOUTES_REGIONS]))
+    return stats
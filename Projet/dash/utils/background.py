@@ -0,0 +1,73 @@
+import functools
+import os
+import tempfile
+from pathlib import Path
+
+import dash
+from dash import DiskcacheManager
+
+
+def _create_cache():
+    """
+    Crée le cache disque partagé entre le serveur et les processus de calcul.
+    Il sert au gestionnaire des callbacks en arrière-plan (DiskcacheManager),
+    grâce auquel les calculs lourds tournent dans des processus séparés et le
+    worker Flask reste libre pour les requêtes légères.
+    Si diskcache / multiprocess / psutil ne sont pas installés, on renvoie None :
+    les callbacks restent synchrones (comportement historique).
+    """
+    try:
+        import diskcache
+        import multiprocess  # noqa: F401  (requis par DiskcacheManager)
+        import psutil  # noqa: F401
+    except ImportError as e:
+        print(f">> [Background] Module {e.name} absent : callbacks exécutés en synchrone.")
+        return None
+
+    cache_dir = os.environ.get("DASHBOARD_CACHE_DIR", str(Path(tempfile.gettempdir()) / "dashboard_datavis_cache"))
+    print(f">> [Background] Callbacks en arrière-plan actifs (cache : {cache_dir})")
+    return diskcache.Cache(cache_dir)
+
+
+BACKGROUND_CACHE = _create_cache()
+
+# expire : les résultats non récupérés (onglet fermé...) sont purgés après 10 min
+BACKGROUND_MANAGER = DiskcacheManager(BACKGROUND_CACHE, expire=600) if BACKGROUND_CACHE is not None else None
+
+
+def _no_progress(*args, **kwargs):
+    """ Remplace set_progress quand le callback tourne en synchrone """
+    return None
+
+
+def background_callback(*args, progress=None, progress_default=None, **kwargs):
+    """
+    Équivalent de dash.callback pour les vues coûteuses.
+
+    - Avec un gestionnaire disponible : callback en arrière-plan, avec barre de
+      progression (progress) et annulation. Quand les entrées changent pendant
+      un calcul, le navigateur envoie l'identifiant de l'ancien job (oldJob) et
+      Dash tue le processus correspondant : un slider déplacé vite n'empile
+      plus de calculs obsolètes sur le serveur.
+    - Sans gestionnaire : callback synchrone classique ; la fonction reçoit
+      quand même un set_progress (sans effet) en premier argument.
+    """
+    if BACKGROUND_MANAGER is not None:
+        return dash.callback(*args, background=True, manager=BACKGROUND_MANAGER,
+                             progress=progress, progress_default=progress_default, **kwargs)
+
+    # Options propres au mode arrière-plan, ignorées en synchrone
+    for cle in ("cancel", "interval", "cache_args_to_ignore"):
+        kwargs.pop(cle, None)
+
+    def decorator(func):
+        if progress is None:
+            return dash.callback(*args, **kwargs)(func)
+
+        @functools.wraps(func)
+        def wrapper(*values):
+            return func(_no_progress, *values)
+
+        return dash.callback(*args, **kwargs)(wrapper)
+
+    return decorator
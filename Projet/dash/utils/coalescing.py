@@ -0,0 +1,190 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from dash.exceptions import PreventUpdate
+
+from utils.background import BACKGROUND_CACHE
+
+
+class SingleFlight:
+    """
+    Partage les calculs identiques en cours ("single-flight").
+
+    Quand plusieurs requêtes demandent la même clé (ex : la même ville) en même
+    temps, une seule exécute le calcul, les autres attendent et reçoivent le même
+    résultat. Le résultat est partagé : il doit être traité en lecture seule.
+
+    Si un cache diskcache partagé est fourni (mode arrière-plan, un processus par
+    job), la déduplication se fait aussi entre processus : verrou par clé dans le
+    cache + résultat conservé `ttl` secondes pour les requêtes qui suivent.
+    Un processus n'attend jamais plus de `wait` secondes avant de calculer lui-même.
+    """
+
+    def __init__(self, cache=None, ttl=60, wait=30):
+        self._cache = cache
+        self._ttl = ttl
+        self._wait = wait
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, *args, **kwargs):
+        """ Exécute func(*args, **kwargs) une seule fois pour les appels simultanés sur `key` """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = self._run_shared(key, func, *args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+        return result
+
+    def peek(self, key):
+        """ Résultat déjà partagé pour `key` dans le cache disque, sans rien calculer (ou None) """
+        if self._cache is None:
+            return None
+        return self._cache.get(("single-flight", key))
+
+    def _run_shared(self, key, func, *args, **kwargs):
+        if self._cache is None:
+            return func(*args, **kwargs)
+
+        cache_key = ("single-flight", key)
+        lock_key = ("single-flight-lock", key)
+        deadline = time.monotonic() + self._wait
+
+        while True:
+            result = self._cache.get(cache_key)
+            if result is not None:
+                return result
+
+            # Verrou inter-processus (add est atomique) : le premier calcule,
+            # les autres relisent le cache. Le verrou expire tout seul si le job
+            # qui le tient est tué (requête dépassée).
+            if self._cache.add(lock_key, True, expire=self._wait):
+                try:
+                    result = func(*args, **kwargs)
+                    self._cache.set(cache_key, result, expire=self._ttl)
+                    return result
+                finally:
+                    self._cache.delete(lock_key)
+
+            if time.monotonic() > deadline:
+                return func(*args, **kwargs)
+            time.sleep(0.05)
+
+
+class MemoryLRU:
+    """
+    Petit cache LRU en mémoire (thread-safe) pour les structures dérivées des
+    séries : pyramides temporelles, sommes cumulées... Les valeurs sont partagées
+    et doivent être traitées en lecture seule.
+    """
+
+    def __init__(self, maxsize=32):
+        self._maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """ Valeur gardée pour `key` (ou None) """
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+        return None
+
+    def put(self, key, value):
+        """ Garde `value` ; si une valeur existe déjà pour `key`, c'est elle qui est renvoyée """
+        with self._lock:
+            value = self._items.setdefault(key, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self._maxsize:
+                self._items.popitem(last=False)
+        return value
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+        value = build()
+        with self._lock:
+            self._items[key] = value
+            while len(self._items) > self._maxsize:
+                self._items.popitem(last=False)
+        return value
+
+
+class RequestGate:
+    """
+    Abandonne les calculs dépassés par une requête plus récente de la même session.
+
+    Chaque appel à `enter` incrémente un compteur par (session, callback) ; la
+    fonction `check()` renvoyée, appelée après chaque étape lourde, lève
+    PreventUpdate si une requête plus récente est arrivée entre-temps (le résultat
+    serait aussitôt remplacé). Aucune attente : une requête seule n'est pas ralentie.
+    Le compteur vit dans le cache partagé s'il existe (incr atomique entre processus) ;
+    il expire `expire` secondes après la dernière requête de la session, pour que le
+    cache disque ne grossisse pas d'un compteur par chargement de page. Sans cache,
+    les compteurs en mémoire sont bornés aux `maxsize` sessions les plus récentes.
+    """
+
+    def __init__(self, cache=None, expire=3600, maxsize=4096):
+        self._cache = cache
+        self._expire = expire
+        self._lock = threading.Lock()
+        self._counters = MemoryLRU(maxsize=maxsize)
+
+    def _incr(self, key):
+        if self._cache is not None:
+            token = self._cache.incr(key, default=0)
+            self._cache.touch(key, expire=self._expire)
+            return token
+        cell = self._counters.put(key, [0])
+        with self._lock:
+            cell[0] += 1
+            return cell[0]
+
+    def _current(self, key):
+        if self._cache is not None:
+            return self._cache.get(key, default=0)
+        cell = self._counters.get(key)
+        with self._lock:
+            return cell[0] if cell is not None else 0
+
+    def enter(self, session_id, slot):
+        """
+        Enregistre une nouvelle requête.
+        Renvoie une fonction `check()` à appeler après les étapes lourdes.
+        """
+        if not session_id:
+            return lambda: None
+
+        key = ("request-gate", session_id, slot)
+        token = self._incr(key)
+
+        def check():
+            if self._current(key) != token:
+                raise PreventUpdate
+
+        return check
+
+
+# Instances partagées par les pages (cache disque commun si disponible)
+FLIGHTS = SingleFlight(BACKGROUND_CACHE)
+GATE = RequestGate(BACKGROUND_CACHE)
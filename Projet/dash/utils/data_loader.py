@@ -1,14 +1,32 @@
 import xarray as xr
 import pandas as pd
 from pathlib import Path
+import functools
 import sys
 
+DIR_DONNEES = Path(__file__).resolve().parent.parent.parent / "Donnees"
 
 
+def weights_path():
+    """
+    Fichier des poids régionaux : weights_bool_precise.nc s'il existe, sinon
+    DonneesRegion/poids_regions_finie.nc. C'est ce fichier que `python -m
+    utils.spatial --poids` régénère, pour que le chargement lise les nouveaux poids.
+    """
+    chemin = DIR_DONNEES / "DonneesTemperaturePays" / "weights_bool_precise.nc"
+    if not chemin.exists():
+        # Fallback si le fichier n'est pas là
+        chemin = DIR_DONNEES / "DonneesRegion" / "poids_regions_finie.nc"
+    return chemin
+
+
+@functools.lru_cache(maxsize=1)
 def load_all_data():
     """
     Charge l'ensemble des datasets (Villes + Météo + Poids)
     Gère les chemins, les formats et la conversion Kelvin -> Celsius.
+    Le résultat est mis en cache : les pages et les routes Flask partagent les
+    mêmes objets (à ne pas modifier en place).
     """
     print(">> [Data Loader] Initialisation...")
 
@@ -28,6 +46,16 @@ def load_all_data():
        sys.exit(f"[ERREUR] Fichier villes introuvable.")
 
     df_villes = pd.read_parquet(chemin_villes)
+
+    # Villes sans région : affectation point-dans-polygone depuis region.shp s'il est présent
+    manquantes = df_villes["Region_Assignee"].isna()
+    chemin_shp = data_dir / "DonneesRegion" / "region.shp"
+    if manquantes.any() and chemin_shp.exists():
+        from utils.spatial import assign_regions
+        df_villes.loc[manquantes, "Region_Assignee"] = assign_regions(
+            df_villes.loc[manquantes, "lat"].values, df_villes.loc[manquantes, "lon"].values, chemin_shp).values
+        print(f">> [Data Loader] {manquantes.sum()} villes affectées depuis region.shp")
+
     df_villes["Region_Assignee"] = df_villes["Region_Assignee"].fillna("Hors Region").astype(str).str.strip()
 
     # 3. Chargement Météo (Gestion de plusieurs noms possibles)
@@ -46,10 +74,7 @@ def load_all_data():
         sys.exit(f"[ERREUR] Aucun fichier météo trouvé dans {dir_meteo}")
 
     # 4. Chargement des Poids (Weights)
-    chemin_poids = dir_meteo / "weights_bool_precise.nc"
-    if not chemin_poids.exists():
-        # Fallback si le fichier n'est pas là
-        chemin_poids = data_dir / "DonneesRegion" / "poids_regions_finie.nc"
+    chemin_poids = weights_path()
 
 
 
@@ -81,3 +106,22 @@ def load_all_data():
     print(">> [Data Loader] Données chargées avec succès.")
     return ds, ds_poids, df_villes
 
+
+
+@functools.lru_cache(maxsize=1)
+def load_world_data():
+    """
+    Charge et nettoie les données internationales (Berkeley Earth, par pays).
+    Partagé entre la page 3 et la route /data/pays (mis en cache, lecture seule).
+    """
+    chemin_csv = Path(__file__).resolve().parent.parent.parent / "Donnees" / "DonneesTemperaturePays" / "GlobalLandTemperaturesByCountry.csv"
+    if not chemin_csv.exists():
+        print(f"[ERREUR] Fichier introuvable : {chemin_csv}")
+        return pd.DataFrame(columns=['dt', 'AverageTemperature', 'Country', 'Annee'])
+
+    print(">> [Data Loader] Chargement du CSV International...")
+    # On ne charge que les colonnes utiles pour optimiser la mémoire
+    df = pd.read_csv(chemin_csv, usecols=['dt', 'AverageTemperature', 'Country'])
+    df['dt'] = pd.to_datetime(df['dt'])
+    df['Annee'] = df['dt'].dt.year
+    return df
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+
+def detect_episodes(values, dates, seuil, min_len=3):
+    """
+    Détecte les vagues de chaleur : au moins `min_len` jours consécutifs > seuil.
+
+    Encodage par plages (run-length) vectorisé avec NumPy, sur toutes les séries
+    et toutes les années d'un coup : aucune boucle Python sur les jours ni sur
+    les villes, donc assez rapide pour être relancé à chaque mouvement de slider.
+
+    - values : tableau (n_jours, n_series) de températures journalières (NaN = pas de donnée)
+    - dates  : DatetimeIndex des n_jours (jours consécutifs)
+
+    Un épisode est compté l'année de son premier jour. Renvoie un dict :
+      years (n_annees,), count / longest / degree_days (n_annees, n_series)
+    où degree_days est le cumul des degrés au-dessus du seuil pendant les épisodes.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, None]
+    n_days, n_series = values.shape
+    dates = pd.DatetimeIndex(dates)
+
+    above = values > seuil  # NaN -> False : une journée manquante coupe l'épisode
+
+    # Débuts (+1) et fins (-1) des plages, colonne par colonne (transposé : tri par série)
+    padded = np.zeros((n_series, n_days + 2), dtype=np.int8)
+    padded[:, 1:-1] = above.T
+    edges = np.diff(padded, axis=1)
+    start_col, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    lengths = ends - starts
+
+    keep = lengths >= min_len
+    start_col, starts, ends, lengths = start_col[keep], starts[keep], ends[keep], lengths[keep]
+
+    # Intensité : somme des dépassements sur [début, fin[ par somme cumulée
+    excess = np.where(above, values - seuil, 0.0)
+    cum = np.vstack([np.zeros(n_series), np.cumsum(excess, axis=0)])
+    intensity = cum[ends, start_col] - cum[starts, start_col]
+
+    years = np.unique(dates.year)
+    year_idx = np.searchsorted(years, dates.year[starts])
+
+    count = np.zeros((len(years), n_series), dtype=np.int32)
+    longest = np.zeros((len(years), n_series), dtype=np.int32)
+    degree_days = np.zeros((len(years), n_series))
+    np.add.at(count, (year_idx, start_col), 1)
+    np.maximum.at(longest, (year_idx, start_col), lengths)
+    np.add.at(degree_days, (year_idx, start_col), intensity)
+
+    return {'years': years, 'count': count, 'longest': longest, 'degree_days': degree_days}
+
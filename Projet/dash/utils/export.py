@@ -0,0 +1,114 @@
+import io
+import re
+import time
+
+from flask import Blueprint, Response, abort, request, stream_with_context
+
+from utils.data_loader import load_all_data
+from utils.indicators import iter_city_indicators
+
+export_bp = Blueprint("export", __name__)
+
+# Objectif de débit : ~35 000 communes françaises en moins de 20 secondes. Mesuré sur
+# une grille 0.1° de 75 ans (1 cœur), en flux par bandes : ~2 400 lignes/s.
+TARGET_ROWS_PER_S = 2000
+
+
+class _ChunkSink(io.RawIOBase):
+    """ Fichier en mémoire vidé à chaque lot : le Parquet part au fil de l'eau """
+
+    def __init__(self):
+        super().__init__()
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer += data
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def _csv_stream(chunks):
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=header, date_format="%Y-%m-%d")
+        header = False
+
+
+def _parquet_stream(chunks):
+    """ Un row group Parquet par lot de communes """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink, writer = _ChunkSink(), None
+    for chunk in chunks:
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(sink, table.schema, compression="snappy")
+        writer.write_table(table.cast(writer.schema))
+        yield sink.drain()
+    if writer is not None:
+        writer.close()
+        yield sink.drain()
+
+
+def _with_throughput(chunks):
+    """ Mesure le débit de l'export (lignes/seconde) et prévient si l'objectif n'est pas tenu """
+    t0, rows = time.perf_counter(), 0
+    for chunk in chunks:
+        rows += len(chunk)
+        yield chunk
+    elapsed = max(time.perf_counter() - t0, 1e-9)
+    rate = rows / elapsed
+    print(f">> [Export] {rows} lignes en {elapsed:.1f}s ({rate:.0f} lignes/s)")
+    if rows and rate < TARGET_ROWS_PER_S:
+        print(f">> [Export] ATTENTION : débit sous l'objectif de {TARGET_ROWS_PER_S} lignes/s")
+
+
+@export_bp.route("/export/indicateurs")
+def export_indicateurs():
+    """
+    Indicateurs de la page 1 pour toutes les communes d'une région.
+    Paramètres : region (défaut : toutes), format (csv | parquet), seuil, gel, lot.
+    Exemple : /export/indicateurs?region=Bretagne&format=parquet&seuil=30
+    """
+    ds, _, df_villes = load_all_data()
+
+    region = request.args.get("region", "Toutes les regions")
+    fmt = request.args.get("format", "csv").lower()
+    seuil = request.args.get("seuil", 30, type=float)
+    seuil_gel = request.args.get("gel", 0, type=float)
+    chunk_rows = request.args.get("lot", 2000, type=int)
+
+    if fmt not in ("csv", "parquet"):
+        abort(400, description="format doit valoir csv ou parquet")
+
+    communes = df_villes if region == "Toutes les regions" else df_villes[df_villes["Region_Assignee"] == region]
+    # Doublons exacts seulement : deux communes homonymes (positions différentes) restent deux lignes
+    communes = communes.drop_duplicates(subset=["label", "lat", "lon"])
+    if communes.empty:
+        abort(404, description=f"Aucune commune pour la région {region}")
+
+    chunks = _with_throughput(iter_city_indicators(ds, communes, seuil, seuil_gel, max(chunk_rows, 1)))
+    if fmt == "parquet":
+        body, mimetype = _parquet_stream(chunks), "application/vnd.apache.parquet"
+    else:
+        body, mimetype = _csv_stream(chunks), "text/csv"
+
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", region).strip("_").lower()
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="indicateurs_{slug}.{fmt}"'},
+    )
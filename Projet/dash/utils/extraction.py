@@ -0,0 +1,252 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from utils.background import BACKGROUND_CACHE
+from utils.coalescing import FLIGHTS, MemoryLRU, SingleFlight
+from utils.regions import TOUTES_REGIONS, compute_region_series
+
+# Parallélisme borné (configurable) pour les extractions multi-villes
+MAX_WORKERS = int(os.environ.get("DASHBOARD_EXTRACT_WORKERS", "4"))
+
+# Pool de processus pour extract_many_cities : désactivé par défaut (workers web,
+# ex. gunicorn sync où chaque requête tourne sur le thread principal) ; à activer
+# explicitement (DASHBOARD_EXTRACT_PROCESSES=1) ou par processes=True (lots hors ligne)
+USE_PROCESSES = os.environ.get("DASHBOARD_EXTRACT_PROCESSES", "0") == "1"
+
+_executor = None
+_executor_pid = None
+
+# Pool de processus des extractions (créé par fork, hérite du dataset ouvert)
+_process_executor = None
+_process_key = None
+_forked_data = None
+
+# Tableau des séries régionales partagé entre processus (clé = fichiers météo et poids) ;
+# expiration d'une semaine pour purger les tableaux des anciennes versions des fichiers
+_REGION_FLIGHTS = SingleFlight(BACKGROUND_CACHE, ttl=7 * 24 * 3600, wait=600)
+_region_tables = {}
+
+# Séries de villes extraites, partagées avec les processus d'arrière-plan (clé = fichier + ville)
+_CITY_FLIGHTS = SingleFlight(BACKGROUND_CACHE, ttl=3600)
+
+# Cache unique par ville : série + structures dérivées (sommes cumulées, pyramide)
+_city_cache = MemoryLRU(maxsize=64)
+
+
+def _city_series(ds, df_villes, ville_name):
+    row = df_villes[df_villes['label'] == ville_name].iloc[0]
+    lat, lon = row['lat'], row['lon']
+    offset = 0.25
+    subset = ds['temp_c'].sel(lat=slice(lat - offset, lat + offset), lon=slice(lon - offset, lon + offset))
+
+    # Gestion des points en mer ou vides
+    if subset.isnull().all() or subset.mean().isnull():
+        offset = 0.8
+        subset = ds['temp_c'].sel(lat=slice(lat - offset, lat + offset), lon=slice(lon - offset, lon + offset))
+
+    return subset.mean(['lat', 'lon']).to_dataframe(name='temp')
+
+
+def _dataset_key(ds):
+    """ Identifie le fichier d'un dataset (chemin + date de modification) pour les caches """
+    source = ds.encoding.get('source', '')
+    try:
+        return source, os.path.getmtime(source)
+    except OSError:
+        return source, None
+
+
+def region_table(ds, ds_poids, warm_only=False):
+    """
+    Séries journalières de toutes les régions (une colonne par région), calculées
+    en une seule passe par produit matrice creuse (utils.regions) puis gardées en
+    mémoire. Avec le cache partagé, les processus d'arrière-plan réutilisent le
+    même tableau au lieu de refaire la passe.
+
+    warm_only=True : renvoie None plutôt que de lancer la passe (callbacks synchrones).
+    """
+    # Les poids font partie de la clé : regénérés (utils.spatial --poids), le tableau est recalculé
+    key = (_dataset_key(ds), _dataset_key(ds_poids))
+    table = _region_tables.get(key)
+    if table is None:
+        if warm_only:
+            table = _REGION_FLIGHTS.peek(("regions", key))
+            if table is None:
+                return None
+        else:
+            table = _REGION_FLIGHTS.do(("regions", key), compute_region_series, ds, ds_poids)
+        _region_tables[key] = table
+    return table
+
+
+def _region_series(ds, ds_poids, region):
+    table = region_table(ds, ds_poids)
+    # Région inconnue des poids : moyenne simple de la grille (comme avant)
+    column = region if region in table.columns else TOUTES_REGIONS
+    return table[column].resample('YE').mean().rename('temp')
+
+
+def extract_city_data(ds, df_villes, ville_name):
+    """
+    Série journalière (DataFrame, colonne 'temp') moyennée autour d'une ville.
+    Fenêtre de ±0.25°, élargie à ±0.8° si la ville tombe en mer / sur des vides.
+    Les demandes simultanées pour la même ville partagent un seul calcul :
+    le DataFrame renvoyé ne doit pas être modifié en place.
+    """
+    return _CITY_FLIGHTS.do(("ville", _dataset_key(ds), ville_name), _city_series, ds, df_villes, ville_name)
+
+
+class CityEntry:
+    """
+    Entrée du cache par ville : la série journalière et les structures qui en
+    dérivent (sommes cumulées, pyramide temporelle), construites une seule fois.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    def derived(self, name, build):
+        """ Structure `name` construite depuis la série (build(temp)) puis gardée """
+        with self._lock:
+            if name not in self._derived:
+                self._derived[name] = build(self.data['temp'])
+            return self._derived[name]
+
+
+def remember_city(ds, ville_name, data):
+    """ Range une série déjà extraite dans le cache par ville et renvoie son entrée """
+    return _city_cache.put((_dataset_key(ds), ville_name), CityEntry(data))
+
+
+def city_entry(ds, df_villes, ville_name, warm_only=False):
+    """
+    Entrée du cache par ville (série + dérivées). Extraction à froid si besoin ;
+    avec warm_only=True, seules les séries déjà extraites (en mémoire ou par un
+    callback d'arrière-plan dans le cache partagé) sont utilisées, sinon None.
+    """
+    key = (_dataset_key(ds), ville_name)
+    entry = _city_cache.get(key)
+    if entry is not None:
+        return entry
+    if warm_only:
+        data = _CITY_FLIGHTS.peek(("ville", key[0], ville_name))
+        if data is None:
+            return None
+    else:
+        data = extract_city_data(ds, df_villes, ville_name)
+    return remember_city(ds, ville_name, data)
+
+
+def extract_region_data(ds, ds_poids, region):
+    """
+    Série annuelle moyenne d'une région (pondérée par ds_poids), ou de toute la
+    grille pour "Toutes les regions". Lue dans le tableau de toutes les régions.
+    """
+    return FLIGHTS.do(("region", _dataset_key(ds), _dataset_key(ds_poids), region), _region_series, ds, ds_poids, region)
+
+
+def get_executor():
+    """
+    Pool de threads partagé pour les calculs NumPy par lots (tendances...), qui
+    relâchent le GIL. Le pool est recréé après un fork (processus d'arrière-plan),
+    les threads du parent n'existant pas dans l'enfant.
+    """
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="extraction")
+        _executor_pid = os.getpid()
+    return _executor
+
+
+def _can_fork():
+    """
+    Fork seulement depuis le thread principal : dans un serveur multi-thread, un
+    autre thread peut tenir le verrou NetCDF de xarray au moment du fork, et
+    l'enfant resterait bloqué. Ne suffit pas à rendre le fork souhaitable dans un
+    worker web (cf. USE_PROCESSES).
+    """
+    return "fork" in multiprocessing.get_all_start_methods() and threading.current_thread() is threading.main_thread()
+
+
+def get_process_executor(ds, df_villes):
+    """
+    Pool de processus pour les extractions multi-villes.
+    Les lectures NetCDF passent toutes par le verrou global de xarray
+    (NETCDF4_PYTHON_LOCK, HDF5 + netCDF-C) : des threads les font l'une après
+    l'autre, des processus en parallèle. Les processus sont créés par fork et
+    héritent du dataset déjà ouvert ; seules les séries extraites reviennent.
+    Le pool est recréé après un changement de processus ou de dataset.
+    """
+    global _process_executor, _process_key, _forked_data
+    key = (os.getpid(), id(ds), id(df_villes))
+    if _process_executor is None or _process_key != key:
+        if _process_executor is not None and _process_key[0] == os.getpid():
+            _process_executor.shutdown(wait=False)
+        _forked_data = (ds, df_villes)  # lu par les processus (fork au premier submit)
+        _process_executor = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=multiprocessing.get_context("fork"))
+        _process_key = key
+    return _process_executor
+
+
+def _timed_extract(ds, df_villes, ville_name):
+    """ Extraction d'une ville et sa durée ; DataFrame vide en cas d'erreur """
+    t0 = time.perf_counter()
+    try:
+        df = extract_city_data(ds, df_villes, ville_name)
+    except Exception as e:
+        print(f">> [Extraction] Erreur {ville_name} : {e}")
+        df = pd.DataFrame()
+    return df, time.perf_counter() - t0
+
+
+def _timed_extract_forked(ville_name):
+    ds, df_villes = _forked_data
+    return _timed_extract(ds, df_villes, ville_name)
+
+
+def extract_many_cities(ds, df_villes, villes, executor=None, on_done=None, processes=None):
+    """
+    Extrait plusieurs villes en parallèle (réutilisable pour les exports / lots).
+
+    - executor : n'importe quel concurrent.futures.Executor. Par défaut, pool de
+      threads borné (get_executor) : les lectures NetCDF y sont sérialisées, mais
+      aucun processus n'est créé depuis un worker web.
+      Un ProcessPoolExecutor fourni ici reçoit le dataset par pickle.
+    - processes : pool de processus par fork (get_process_executor), pour les
+      chemins hors ligne / CLI ; None = réglage USE_PROCESSES. Ignoré si le fork
+      n'est pas sûr (hors du thread principal).
+    - on_done(ville, secondes) : appelé à la fin de chaque extraction (progression)
+
+    Renvoie (series, timings) : {ville: DataFrame} (vide en cas d'erreur)
+    et {ville: durée en secondes}.
+    """
+    # dict.fromkeys : dédoublonne en gardant l'ordre (Ville A == Ville B...)
+    villes = list(dict.fromkeys(villes))
+    if processes is None:
+        processes = USE_PROCESSES
+    if executor is None and processes and _can_fork():
+        pool = get_process_executor(ds, df_villes)
+        futures = {pool.submit(_timed_extract_forked, v): v for v in villes}
+    else:
+        pool = executor or get_executor()
+        futures = {pool.submit(_timed_extract, ds, df_villes, v): v for v in villes}
+
+    series, timings = {}, {}
+    for future in as_completed(futures):
+        ville_name = futures[future]
+        series[ville_name], timings[ville_name] = future.result()
+        if not series[ville_name].empty:
+            # Série disponible pour les callbacks légers de ce processus (épisodes, zoom)
+            remember_city(ds, ville_name, series[ville_name])
+        if on_done:
+            on_done(ville_name, timings[ville_name])
+
+    print(">> [Extraction] " + ", ".join(f"{v} : {t:.2f}s" for v, t in timings.items()))
+    return series, timings
@@ -0,0 +1,198 @@
+"""
+Niveaux de retour (ex : "journée la plus chaude 1 fois en 50 ans") par cellule de grille.
+
+Pipeline hors ligne : maxima annuels de chaque cellule -> ajustement d'une loi GEV
+(scipy.stats.genextreme) -> niveau de retour + intervalle de confiance par bootstrap
+paramétrique. Les cellules sont ajustées en parallèle sur un pool de processus, par
+lots sauvegardés au fil de l'eau : un calcul interrompu reprend là où il s'était arrêté.
+
+Lancement (depuis Projet/dash) :
+    python -m utils.extremes --periode 50 --workers 8 --bootstrap 200
+
+Le résultat est une table compacte (Parquet) indexée par cellule (lat_idx, lon_idx),
+lue instantanément par la page 1.
+"""
+import argparse
+import functools
+import json
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy.stats import genextreme
+
+DIR_METEO = Path(__file__).resolve().parent.parent.parent / "Donnees" / "DonneesTemperaturePays"
+CHEMIN_NIVEAUX = DIR_METEO / "niveaux_retour.parquet"
+DIR_PARTIEL = DIR_METEO / "niveaux_retour_partiel"
+
+PERIODE_RETOUR = 50
+MIN_ANNEES = 20  # en dessous, l'ajustement GEV n'est pas fiable
+
+
+def annual_maxima(ds, years_per_read=10):
+    """ Maxima annuels (n_annees, lat, lon), le cube étant lu par blocs d'années """
+    temp = ds['temp_c'].transpose('time', 'lat', 'lon')
+    years_all = pd.DatetimeIndex(temp['time'].values).year
+    years = np.unique(years_all)
+    maxima = np.full((len(years), temp.sizes['lat'], temp.sizes['lon']), np.nan, dtype=np.float32)
+
+    for start in range(0, len(years), years_per_read):
+        t_idx = np.flatnonzero(np.isin(years_all, years[start:start + years_per_read]))
+        block = temp.isel(time=slice(t_idx[0], t_idx[-1] + 1)).values
+        block_years = years_all[t_idx[0]:t_idx[-1] + 1]
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)  # cellules en mer (tout NaN)
+            for k, year in enumerate(years[start:start + years_per_read]):
+                maxima[start + k] = np.nanmax(block[block_years == year], axis=0)
+    return years, maxima
+
+
+def _fit_chunk(maxima, periode, n_boot, seed):
+    """
+    Ajuste une GEV par ligne de `maxima` (n_cellules, n_annees).
+    Renvoie (tableau niveau / ic_bas / ic_haut par cellule, nombre d'années par cellule).
+    """
+    rng = np.random.default_rng(seed)
+    proba = 1.0 / periode
+    out = np.full((len(maxima), 3), np.nan)
+    n_years = (~np.isnan(maxima)).sum(axis=1)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # avertissements d'optimisation de scipy
+        for k, row in enumerate(maxima):
+            x = row[~np.isnan(row)]
+            if len(x) < MIN_ANNEES:
+                continue
+            c, loc, scale = genextreme.fit(x)
+            out[k, 0] = genextreme.isf(proba, c, loc, scale)
+
+            if n_boot:
+                samples = genextreme.rvs(c, loc, scale, size=(n_boot, len(x)), random_state=rng)
+                levels = [genextreme.isf(proba, *genextreme.fit(s, c, loc=loc, scale=scale)) for s in samples]
+                out[k, 1], out[k, 2] = np.nanpercentile(levels, [2.5, 97.5])
+
+    return out, n_years
+
+
+def _run_chunk(chunk_id, cells, maxima, periode, n_boot):
+    """ Tâche du pool : ajuste un lot de cellules et le sauvegarde (checkpoint) """
+    t0 = time.perf_counter()
+    out, n_years = _fit_chunk(maxima, periode, n_boot, seed=chunk_id)
+    # Fichier temporaire puis renommage atomique : un arrêt en cours d'écriture ne laisse pas de lot tronqué
+    chemin = DIR_PARTIEL / f"lot_{chunk_id:05d}.parquet"
+    tmp = chemin.with_suffix(".tmp")
+    pd.DataFrame({
+        'cell': cells.astype(np.int64),
+        'niveau': out[:, 0].astype(np.float32),
+        'ic_bas': out[:, 1].astype(np.float32),
+        'ic_haut': out[:, 2].astype(np.float32),
+        'n_annees': n_years.astype(np.int16),
+    }).to_parquet(tmp, index=False)
+    os.replace(tmp, chemin)
+    return chunk_id, len(cells), time.perf_counter() - t0
+
+
+def build_return_levels(ds, periode=PERIODE_RETOUR, n_boot=100, workers=None, chunk_cells=200):
+    """
+    Calcule les niveaux de retour de toutes les cellules terrestres et écrit CHEMIN_NIVEAUX.
+    Les lots déjà présents dans DIR_PARTIEL (même paramétrage, même fichier de données)
+    sont repris tels quels.
+    """
+    years, maxima = annual_maxima(ds)
+    n_lat, n_lon = maxima.shape[1:]
+    flat = maxima.reshape(len(years), -1).T  # (cellules, années)
+    cells = np.flatnonzero((~np.isnan(flat)).any(axis=1))  # cellules terrestres, ordre stable
+
+    # Paramétrage du calcul et fichier source : un checkpoint d'un autre paramétrage,
+    # ou calculé sur une autre version des données, n'est pas réutilisé
+    DIR_PARTIEL.mkdir(parents=True, exist_ok=True)
+    source = ds.encoding.get('source', '')
+    meta = {'periode': periode, 'n_boot': n_boot, 'chunk_cells': chunk_cells,
+            'n_cells': int(len(cells)), 'grille': [int(n_lat), int(n_lon)],
+            'source': source, 'mtime': os.path.getmtime(source) if os.path.exists(source) else None}
+    chemin_meta = DIR_PARTIEL / "meta.json"
+    if chemin_meta.exists() and json.loads(chemin_meta.read_text()) != meta:
+        print(">> [Extremes] Paramètres différents du checkpoint : reprise depuis zéro.")
+        for f in [*DIR_PARTIEL.glob("lot_*.parquet"), *DIR_PARTIEL.glob("lot_*.tmp")]:
+            f.unlink()
+    chemin_meta.write_text(json.dumps(meta))
+
+    chunks = [(k, cells[s:s + chunk_cells]) for k, s in enumerate(range(0, len(cells), chunk_cells))]
+    todo = [(k, c) for k, c in chunks if not (DIR_PARTIEL / f"lot_{k:05d}.parquet").exists()]
+    print(f">> [Extremes] {len(cells)} cellules, {len(chunks)} lots ({len(chunks) - len(todo)} déjà faits)")
+
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_run_chunk, k, c, flat[c], periode, n_boot) for k, c in todo]
+        for done, future in enumerate(as_completed(futures), start=1):
+            chunk_id, n, seconds = future.result()
+            print(f">> [Extremes] Lot {chunk_id} ({n} cellules, {seconds:.1f}s) - {done}/{len(todo)}"
+                  f" - {time.perf_counter() - t0:.0f}s écoulées")
+
+    # Table finale compacte, indexée comme la grille (lat_idx, lon_idx)
+    table = pd.concat([pd.read_parquet(DIR_PARTIEL / f"lot_{k:05d}.parquet") for k, _ in chunks], ignore_index=True)
+    lat_idx, lon_idx = np.unravel_index(table.pop('cell').values, (n_lat, n_lon))
+    table.insert(0, 'lat_idx', lat_idx.astype(np.int16))
+    table.insert(1, 'lon_idx', lon_idx.astype(np.int16))
+    table['periode'] = np.int16(periode)
+    table.to_parquet(CHEMIN_NIVEAUX, index=False)
+    print(f">> [Extremes] Niveaux de retour écrits dans {CHEMIN_NIVEAUX}")
+    return table
+
+
+@functools.lru_cache(maxsize=1)
+def _read_return_levels(mtime):
+    """ Lecture de la table (la date de modification sert de clé au cache) """
+    return pd.read_parquet(CHEMIN_NIVEAUX).set_index(['lat_idx', 'lon_idx']).sort_index()
+
+
+def load_return_levels():
+    """
+    Table des niveaux de retour indexée par (lat_idx, lon_idx), ou None si pas encore calculée.
+    Relue quand le fichier est regénéré ; l'absence du fichier n'est pas mise en cache.
+    """
+    try:
+        mtime = os.path.getmtime(CHEMIN_NIVEAUX)
+    except OSError:
+        return None
+    return _read_return_levels(mtime)
+
+
+def city_return_level(ds, lat, lon):
+    """
+    Niveau de retour autour d'une ville (Series), ou None.
+    Même fenêtre que les séries de villes (utils.extraction) : moyenne des niveaux
+    des cellules à ±0.25°, élargie à ±0.8° si aucune n'a de niveau (villes côtières).
+    """
+    table = load_return_levels()
+    if table is None:
+        return None
+    lats, lons = ds['lat'].values, ds['lon'].values
+    for offset in (0.25, 0.8):
+        cells = pd.MultiIndex.from_product([np.flatnonzero(np.abs(lats - lat) <= offset),
+                                            np.flatnonzero(np.abs(lons - lon) <= offset)])
+        window = table.reindex(cells).dropna(subset=['niveau'])
+        if not window.empty:
+            row = window[['niveau', 'ic_bas', 'ic_haut']].mean()
+            row['periode'] = window['periode'].iloc[0]
+            row['n_cellules'] = len(window)
+            return row
+    return None
+
+
+if __name__ == '__main__':
+    from utils.data_loader import load_all_data
+
+    parser = argparse.ArgumentParser(description="Niveaux de retour GEV par cellule de grille")
+    parser.add_argument("--periode", type=int, default=PERIODE_RETOUR, help="Période de retour en années")
+    parser.add_argument("--bootstrap", type=int, default=100, help="Tirages bootstrap pour l'IC 95%% (0 = sans IC)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processus en parallèle")
+    parser.add_argument("--lot", type=int, default=200, help="Cellules par lot (checkpoint)")
+    args = parser.parse_args()
+
+    ds, _, _ = load_all_data()
+    build_return_levels(ds, args.periode, args.bootstrap, args.workers, args.lot)
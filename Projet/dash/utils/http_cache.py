@@ -0,0 +1,155 @@
+"""
+Cache HTTP du serveur Flask : compression des réponses et endpoints de données immuables.
+
+1. Compression (brotli si le paquet est installé, sinon gzip) des réponses Dash
+   (callbacks, layout, scripts des composants) et des endpoints /data/.
+   Les réponses en flux (export CSV / Parquet) ne sont pas touchées.
+2. Requêtes conditionnelles : toute réponse GET portant un ETag renvoie 304 si le
+   navigateur a déjà la même version (If-None-Match), avant compression.
+3. Endpoints de données déterministes (/data/...) : ETag = empreinte du contenu.
+   Avec ?v=<etag> dans l'URL, la réponse est marquée immuable pour un an : le
+   navigateur ou un reverse proxy local la resservent sans solliciter Python.
+"""
+import gzip
+import hashlib
+import json
+
+import numpy as np
+from flask import Blueprint, Response, abort, request
+
+from utils.anomalies import city_stats
+from utils.coalescing import MemoryLRU
+from utils.data_loader import load_all_data, load_world_data
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Préfixes des réponses à compresser
+COMPRESSIBLE_PREFIXES = ("/_dash-update-component", "/_dash-layout", "/_dash-dependencies",
+                         "/_dash-component-suites/", "/data/")
+MIN_SIZE = 500  # en dessous, la compression ne vaut pas le coût
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # compromis vitesse / taux pour des réponses calculées à la volée
+
+MAX_AGE_IMMUTABLE = 31536000  # 1 an (URL versionnée)
+MAX_AGE_DATA = 3600  # URL non versionnée : revalidation par ETag au bout d'une heure
+
+# Versions compressées des réponses stables (scripts, données) : compressées une seule fois
+_compressed = MemoryLRU(maxsize=128)
+_payloads = MemoryLRU(maxsize=256)
+
+data_bp = Blueprint("data", __name__)
+
+
+# =============================================================================
+# 1. COMPRESSION ET REQUÊTES CONDITIONNELLES
+# =============================================================================
+
+def _encode(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def _choose_encoding():
+    offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+    return request.accept_encodings.best_match(offered)
+
+
+def _after_request(response):
+    if request.method == "GET" and response.status_code == 200 and response.get_etag()[0]:
+        response.make_conditional(request)  # 304 si If-None-Match correspond (comparaison faible)
+
+    if (response.status_code != 200
+            or response.direct_passthrough
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or not request.path.startswith(COMPRESSIBLE_PREFIXES)):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = _choose_encoding()
+    data = response.get_data()
+    if encoding is None or len(data) < MIN_SIZE:
+        return response
+
+    # Une réponse stable (ETag, ou cache long des scripts versionnés) n'est compressée qu'une fois
+    etag, _ = response.get_etag()
+    if etag or (response.cache_control.max_age or 0) >= MAX_AGE_DATA:
+        body = _compressed.get_or_build((request.full_path, etag, encoding), lambda: _encode(data, encoding))
+    else:
+        body = _encode(data, encoding)
+
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    if etag:
+        # Même contenu, autres octets : l'ETag devient faible
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_http_cache(server):
+    """ Branche la compression et les requêtes conditionnelles sur le serveur Flask """
+    server.after_request(_after_request)
+    server.register_blueprint(data_bp)
+    print(f">> [HTTP] Compression active ({'brotli + gzip' if brotli is not None else 'gzip'})")
+
+
+# =============================================================================
+# 2. ENDPOINTS DE DONNÉES DÉTERMINISTES
+# =============================================================================
+
+def _json_payload(obj):
+    """ JSON compact + ETag (empreinte du contenu) """
+    body = json.dumps(obj, separators=(",", ":"), ensure_ascii=False, allow_nan=False).encode("utf-8")
+    return body, hashlib.sha256(body).hexdigest()[:32]
+
+
+def _data_response(payload):
+    """ Réponse JSON avec ETag ; immuable si l'URL porte la bonne version (?v=etag) """
+    body, etag = payload
+    response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    if request.args.get("v") == etag:
+        response.cache_control.immutable = True
+        response.cache_control.max_age = MAX_AGE_IMMUTABLE
+    else:
+        response.cache_control.max_age = MAX_AGE_DATA
+    response.cache_control.public = True
+    return response
+
+
+def _rounded(values):
+    """ Valeurs arrondies au centième, NaN -> null """
+    return [None if np.isnan(v) else round(float(v), 2) for v in values]
+
+
+@data_bp.route("/data/ville/<path:ville>/annuel.json")
+def city_annual(ville):
+    """ Moyennes annuelles d'une ville (°C). Exemple : /data/ville/Paris/annuel.json """
+    ds, _, df_villes = load_all_data()
+    if ville not in set(df_villes["label"]):
+        abort(404, description=f"Ville inconnue : {ville}")
+
+    def build():
+        stats = city_stats(ds, df_villes, ville)
+        return _json_payload({"ville": ville, "annees": stats.years.tolist(), "moyenne": _rounded(stats.annual_mean)})
+
+    return _data_response(_payloads.get_or_build(("ville", ville), build))
+
+
+@data_bp.route("/data/pays/matrice.json")
+def country_matrix():
+    """ Matrice pays × années des températures moyennes annuelles (°C) """
+    def build():
+        df = load_world_data()
+        matrice = df.groupby(["Country", "Annee"])["AverageTemperature"].mean().unstack("Annee").sort_index()
+        return _json_payload({
+            "pays": matrice.index.tolist(),
+            "annees": [int(a) for a in matrice.columns],
+            "valeurs": [_rounded(ligne) for ligne in matrice.to_numpy(dtype=np.float64)],
+        })
+
+    return _data_response(_payloads.get_or_build(("pays",), build))
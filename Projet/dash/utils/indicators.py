@@ -0,0 +1,293 @@
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Fenêtres autour des villes (mêmes règles que l'extraction page 1 / page 2)
+OFFSET = 0.25
+OFFSET_LARGE = 0.8
+
+# Nombre d'années pour le "Réchauffement (+75 ans)" (5 premières vs 5 dernières)
+ANNEES_DELTA = 5
+
+# Résumé "Mode Élu" : jours d'été (> 25°C), 10 premières vs 10 dernières années
+SEUIL_ETE = 25
+ANNEES_ETE = 10
+
+
+# Lignes de grille par bande de communes (export en flux) : bandes assez hautes
+# pour que la marge des fenêtres (±0.25°) relue par deux bandes voisines reste faible
+BAND_ROWS = 24
+
+# Valeurs lues par bloc de temps (jours × cellules ; ~80 Mo en float32) : borne la mémoire
+BLOCK_VALUES = 20_000_000
+
+
+def _integral(values):
+    """
+    Image intégrale (lat+1, lon+1, time) en float32 : somme d'une fenêtre en 4 lectures.
+    Le temps est le dernier axe : chaque coin lu est une ligne contiguë de jours.
+    Les valeurs doivent être centrées (écart à une valeur de référence du jour)
+    pour que les sommes cumulées restent petites et gardent la précision du float32.
+    """
+    out = np.zeros((values.shape[0] + 1, values.shape[1] + 1, values.shape[2]), dtype=np.float32)
+    # Additions ligne à ligne de blocs contigus : bien plus rapide que np.cumsum hors du dernier axe
+    for i in range(values.shape[0]):
+        np.add(out[i, 1:], values[i], out=out[i + 1, 1:])
+    for j in range(values.shape[1]):
+        np.add(out[1:, j + 1], out[1:, j], out=out[1:, j + 1])
+    return out
+
+
+def _box_sum(integral, i0, i1, j0, j1):
+    """ Sommes des fenêtres (n_fenetres, time) """
+    return integral[i1, j1] - integral[i0, j1] - integral[i1, j0] + integral[i0, j0]
+
+
+def _nanmean(values, axis=0):
+    # Pas de RuntimeWarning pour les villes sans aucune donnée (colonnes tout NaN)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        return np.nanmean(values, axis=axis)
+
+
+def _windows(grid_lat, grid_lon, lats, lons, offset):
+    """
+    Fenêtres distinctes (m, 4) : lat0, lat1, lon0, lon1 (indices, bornes incluses comme
+    .sel(slice)), et pour chaque ville l'indice de sa fenêtre. Sur une grille fine,
+    beaucoup de communes voisines ont exactement la même fenêtre : calculée une fois.
+    """
+    boxes = np.stack([np.searchsorted(grid_lat, lats - offset, side='left'), np.searchsorted(grid_lat, lats + offset, side='right'),
+                      np.searchsorted(grid_lon, lons - offset, side='left'), np.searchsorted(grid_lon, lons + offset, side='right')], axis=1)
+    windows, inverse = np.unique(boxes, axis=0, return_inverse=True)
+    return windows, inverse.ravel()
+
+
+class _WindowStats:
+    """ Accumulateurs annuels d'un jeu de fenêtres (une colonne par fenêtre) """
+
+    def __init__(self, windows, n_years):
+        self.boxes = windows.T
+        n = len(windows)
+        self.mean = np.full((n_years, n), np.nan)
+        self.hot = np.zeros((n_years, n), dtype=np.int32)
+        self.cold = np.zeros((n_years, n), dtype=np.int32)
+        self.summer = np.zeros((n_years, n), dtype=np.int32)
+        self.valid = np.zeros(n, dtype=np.int64)
+        self.record = np.full(n, -np.inf)
+        self.record_idx = np.zeros(n, dtype=np.int64)
+
+    def add_block(self, sums, counts, center, t0, year_slots, seuils):
+        """ Ajoute un bloc de jours (intégrales centrées) ; year_slots : [(k_annee, slice des jours)] """
+        seuil, seuil_gel, seuil_ete = seuils
+        box_count = _box_sum(counts, *self.boxes)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            daily = np.where(box_count > 0, _box_sum(sums, *self.boxes) / box_count + center, np.nan)
+        daily_valid = ~np.isnan(daily)
+        self.valid += daily_valid.sum(axis=1)
+
+        # Record absolu : on garde la première occurrence du maximum (comme idxmax)
+        filled = np.where(daily_valid, daily, -np.inf)
+        arg = filled.argmax(axis=1)
+        best = filled[np.arange(filled.shape[0]), arg]
+        better = best > self.record
+        self.record[better] = best[better]
+        self.record_idx[better] = t0 + arg[better]
+
+        for k, days in year_slots:
+            d, dv = daily[:, days], daily_valid[:, days]
+            nb = dv.sum(axis=1)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                self.mean[k] = np.where(nb > 0, np.where(dv, d, 0.0).sum(axis=1, dtype=np.float64) / nb, np.nan)
+            self.hot[k] = (d > seuil).sum(axis=1)
+            self.cold[k] = (d < seuil_gel).sum(axis=1)
+            self.summer[k] = (d > seuil_ete).sum(axis=1)
+
+
+def annual_city_stats(ds, lats, lons, seuil=30, seuil_gel=0, years_per_read=None, seuil_ete=SEUIL_ETE):
+    """
+    Statistiques annuelles de N villes en une seule passe sur le cube.
+
+    Chaque ville est la moyenne (NaN ignorés) d'une fenêtre ±0.25° autour d'elle,
+    élargie à ±0.8° si la petite fenêtre est vide sur toute la période : mêmes
+    règles que extract_city_data, mais vectorisées. Le cube est lu une seule fois,
+    par blocs de `years_per_read` années (par défaut : ~BLOCK_VALUES valeurs par
+    bloc), et chaque bloc sert à toutes les villes à la fois grâce à une image
+    intégrale. La fenêtre large n'est calculée que pour les villes dont la petite
+    fenêtre est vide sur la première année (les seules qui peuvent en avoir besoin).
+
+    Renvoie un dict :
+      years (n_annees,), mean / hot / cold / summer (n_annees, n_villes),
+      record (n_villes,), record_date (DatetimeIndex)
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+
+    temp = ds['temp_c']
+    grid_lat = temp['lat'].values
+    grid_lon = temp['lon'].values
+    times = pd.DatetimeIndex(temp['time'].values)
+    years = np.unique(times.year)
+    seuils = (seuil, seuil_gel, seuil_ete)
+
+    # Villes candidates à la fenêtre large : petite fenêtre vide sur la première année
+    small_win, small_of = _windows(grid_lat, grid_lon, lats, lons, OFFSET)
+    la0, la1 = small_win[:, 0].min(), small_win[:, 1].max()
+    lo0, lo1 = small_win[:, 2].min(), small_win[:, 3].max()
+    first = np.flatnonzero(times.year == years[0])
+    probe = ~np.isnan(temp.isel(time=slice(first[0], first[-1] + 1), lat=slice(la0, la1), lon=slice(lo0, lo1)).values)
+    ever_valid = _integral(probe.any(axis=0)[:, :, None].astype(np.float32))
+    empty = _box_sum(ever_valid, *(small_win - [la0, la0, lo0, lo0]).T)[:, 0] == 0
+    candidates = np.flatnonzero(empty[small_of])
+
+    # Sous-cube couvrant les petites fenêtres et les fenêtres larges des candidates
+    large_win, large_of = _windows(grid_lat, grid_lon, lats[candidates], lons[candidates], OFFSET_LARGE)
+    if len(candidates):
+        la0, la1 = min(la0, large_win[:, 0].min()), max(la1, large_win[:, 1].max())
+        lo0, lo1 = min(lo0, large_win[:, 2].min()), max(lo1, large_win[:, 3].max())
+    cube = temp.isel(lat=slice(la0, la1), lon=slice(lo0, lo1))
+    origin = [la0, la0, lo0, lo0]
+
+    small = _WindowStats(small_win - origin, len(years))
+    large = _WindowStats(large_win - origin, len(years)) if len(candidates) else None
+
+    if years_per_read is None:
+        per_year = 366 * max((la1 - la0) * (lo1 - lo0), len(small_win))
+        years_per_read = max(1, BLOCK_VALUES // per_year)
+
+    for start in range(0, len(years), years_per_read):
+        block_years = years[start:start + years_per_read]
+        t_idx = np.flatnonzero(np.isin(times.year, block_years))
+        t0, t1 = t_idx[0], t_idx[-1] + 1
+        block = np.asarray(cube.isel(time=slice(t0, t1)).values, dtype=np.float32).transpose(1, 2, 0)
+        valid = ~np.isnan(block)
+
+        # Centrage par jour (moyenne d'un échantillon de cellules) : sommes cumulées petites
+        center = np.nan_to_num(_nanmean(block[::8, ::8].reshape(-1, block.shape[2]), axis=0)).astype(np.float32)
+        sums = _integral(np.where(valid, block - center, np.float32(0)))
+        # Masque terre / mer fixe sur le bloc (cas courant) : une seule image 2D des effectifs
+        mask = valid.all(axis=2)
+        if np.array_equal(mask, valid.any(axis=2)):
+            counts = _integral(mask[:, :, None].astype(np.float32))
+        else:
+            counts = _integral(valid.astype(np.float32))
+        del block, valid
+        day_years = times.year[t0:t1]
+        year_slots = [(start + k, slice(*np.flatnonzero(day_years == year)[[0, -1]] + [0, 1]))
+                      for k, year in enumerate(block_years)]
+
+        small.add_block(sums, counts, center, t0, year_slots, seuils)
+        if large is not None:
+            large.add_block(sums, counts, center, t0, year_slots, seuils)
+
+    # Fenêtre de chaque ville ; élargie si la petite est vide sur toute la période (mer...)
+    use_large = small.valid[small_of[candidates]] == 0
+
+    def pick(name):
+        out = getattr(small, name)[..., small_of]
+        if large is not None:
+            out[..., candidates[use_large]] = getattr(large, name)[..., large_of[use_large]]
+        return out
+
+    record, record_idx = pick('record'), pick('record_idx')
+    no_data = ~np.isfinite(record)
+    record[no_data] = np.nan
+
+    return {
+        'years': years,
+        'mean': pick('mean'),
+        'hot': pick('hot'),
+        'cold': pick('cold'),
+        'summer': pick('summer'),
+        'record': record,
+        'record_date': pd.DatetimeIndex(np.where(no_data, np.datetime64('NaT'), times.values[record_idx])),
+    }
+
+
+def compute_city_indicators(ds, communes, seuil=30, seuil_gel=0):
+    """
+    KPIs de la page 1 pour un lot de communes (DataFrame label / lat / lon / Region_Assignee).
+    Une ligne par commune : moyenne, record et sa date, réchauffement 75 ans,
+    jours de canicule et de gel (moyenne annuelle sur toute la période et sur les
+    5 dernières années).
+    """
+    st = annual_city_stats(ds, communes['lat'].values, communes['lon'].values, seuil, seuil_gel)
+    mean, hot, cold = st['mean'], st['hot'], st['cold']
+
+    return pd.DataFrame({
+        'label': communes['label'].values,
+        'region': communes['Region_Assignee'].values,
+        'lat': communes['lat'].values,
+        'lon': communes['lon'].values,
+        'moyenne_annuelle': _nanmean(mean).round(2),
+        'record': st['record'].round(2),
+        'date_record': st['record_date'],
+        'delta_75ans': (_nanmean(mean[-ANNEES_DELTA:]) - _nanmean(mean[:ANNEES_DELTA])).round(2),
+        'jours_canicule_moy': hot.mean(axis=0).round(1),
+        'jours_canicule_recent': hot[-ANNEES_DELTA:].mean(axis=0).round(1),
+        'jours_gel_moy': cold.mean(axis=0).round(1),
+        'jours_gel_recent': cold[-ANNEES_DELTA:].mean(axis=0).round(1),
+    })
+
+
+def elu_summaries(mean, hot, summer, record, record_date):
+    """
+    Résumé "Mode Élu" de N séries (tableaux (n_annees, n_series) de annual_city_stats) :
+      - delta : réchauffement, 5 dernières années vs 5 premières (°C)
+      - jours_chauds_recent : jours > seuil par an, moyenne des 5 dernières années
+      - gain_ete : jours > 25°C par an, 10 dernières années vs 10 premières
+      - record / annee_record : maximum journalier absolu et son année
+    Une ligne par série. Les jours sont tronqués à l'entier, comme l'affichage de la page 1.
+    """
+    return pd.DataFrame({
+        'delta': _nanmean(mean[-ANNEES_DELTA:]) - _nanmean(mean[:ANNEES_DELTA]),
+        'jours_chauds_recent': np.trunc(hot[-ANNEES_DELTA:].mean(axis=0)).astype(np.int32),
+        'gain_ete': np.trunc(summer[-ANNEES_ETE:].mean(axis=0) - summer[:ANNEES_ETE].mean(axis=0)).astype(np.int32),
+        'record': record,
+        'annee_record': pd.DatetimeIndex(record_date).year,
+    })
+
+
+def elu_summary(temp, seuil=30):
+    """ Résumé "Mode Élu" d'une seule série journalière (Series indexée par date), en dict """
+    temp = temp.dropna()
+    annees = temp.index.year
+    annual = pd.DataFrame({
+        'mean': temp.groupby(annees).mean(),
+        'hot': (temp > seuil).groupby(annees).sum(),
+        'summer': (temp > SEUIL_ETE).groupby(annees).sum(),
+    })
+    summary = elu_summaries(annual[['mean']].values, annual[['hot']].values, annual[['summer']].values,
+                            np.array([temp.max()]), [temp.idxmax()])
+    return summary.iloc[0].to_dict()
+
+
+def iter_bands(ds, communes, band_rows=BAND_ROWS):
+    """
+    Découpe les communes (triées par position) en bandes de `band_rows` lignes de
+    grille : chaque bande se calcule sur son seul sous-cube, et les bandes ne se
+    recouvrent que de la marge des fenêtres.
+    """
+    communes = communes.sort_values(['lat', 'lon'])
+    bands = np.searchsorted(ds['lat'].values, communes['lat'].values) // max(band_rows, 1)
+    for band in np.unique(bands):
+        yield communes[bands == band]
+
+
+def iter_city_indicators(ds, communes, seuil=30, seuil_gel=0, chunk_rows=2000, band_rows=BAND_ROWS):
+    """
+    Générateur de DataFrames d'indicateurs, au plus `chunk_rows` communes à la fois.
+    Chaque bande de communes (iter_bands) est calculée sur toute la période puis
+    envoyée aussitôt : seuls les accumulateurs annuels d'une bande sont en mémoire,
+    et les premières lignes partent dès la première bande finie. Le cube est lu à
+    peu près une fois.
+    """
+    t0, rows = time.perf_counter(), 0
+    for band in iter_bands(ds, communes, band_rows):
+        table = compute_city_indicators(ds, band, seuil, seuil_gel)
+        rows += len(table)
+        for start in range(0, len(table), chunk_rows):
+            yield table.iloc[start:start + chunk_rows]
+    elapsed = time.perf_counter() - t0
+    print(f">> [Indicateurs] {rows} communes en {elapsed:.2f}s ({rows / max(elapsed, 1e-9):.0f} lignes/s)")
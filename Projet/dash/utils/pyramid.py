@@ -0,0 +1,89 @@
+import pandas as pd
+
+from utils.coalescing import MemoryLRU
+from utils.extraction import city_entry, region_table
+from utils.regions import TOUTES_REGIONS
+
+# Niveaux de la pyramide, du plus fin au plus grossier (règle de resample pandas)
+LEVELS = [("D", None), ("W", "W-MON"), ("ME", "ME"), ("YE", "YE")]
+LEVEL_NAMES = {"D": "journalier", "W": "hebdomadaire", "ME": "mensuel", "YE": "annuel"}
+
+# Largeur utile d'un graphique en pixels, quand le navigateur ne l'a pas transmise
+DEFAULT_PIXEL_WIDTH = 900
+
+# Callback côté client : relayoutData + largeur utile du graphique déclencheur
+# (zone de tracé mesurée par Plotly), écrits dans le Store du zoom.
+# relayoutData ne contient pas la largeur ; elle n'est lue que dans le navigateur.
+ZOOM_CLIENTSIDE = """
+function(relayout) {
+    if (!relayout) { return window.dash_clientside.no_update; }
+    var id = dash_clientside.callback_context.triggered[0].prop_id.split('.')[0];
+    var graph = document.querySelector('#' + id + ' .js-plotly-plot');
+    var size = graph && graph._fullLayout && graph._fullLayout._size;
+    return {relayout: relayout, largeur: size ? Math.round(size.w) : null};
+}
+"""
+
+_pyramids = MemoryLRU(maxsize=32)  # régions (les villes passent par le cache par ville)
+
+
+def build_pyramid(series):
+    """ Agrège une série journalière en niveaux journalier / hebdo / mensuel / annuel """
+    series = series.dropna()
+    return {level: series if rule is None else series.resample(rule).mean().dropna()
+            for level, rule in LEVELS}
+
+
+def select_level(pyramid, start, end, pixel_width=DEFAULT_PIXEL_WIDTH):
+    """
+    Choisit le niveau le plus grossier qui remplit encore la largeur visible
+    (au moins un point par pixel) sur [start, end]. Le nombre de points renvoyés
+    reste borné : au pire le niveau journalier quand l'hebdomadaire ne suffit
+    pas, soit moins de 7 points par pixel.
+    Renvoie (niveau, série restreinte à la fenêtre).
+    """
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    for level, _ in reversed(LEVELS):
+        window = pyramid[level].loc[start:end]
+        if len(window) >= pixel_width:
+            return level, window
+    return "D", pyramid["D"].loc[start:end]
+
+
+def city_pyramid(ds, df_villes, ville_name, warm_only=False):
+    """ Pyramide temporelle d'une ville (cache par ville) ; None si warm_only et la série n'est pas extraite """
+    entry = city_entry(ds, df_villes, ville_name, warm_only)
+    return None if entry is None else entry.derived('pyramid', build_pyramid)
+
+
+def region_pyramid(ds, ds_poids, region, warm_only=False):
+    """ Pyramide temporelle d'une région, à partir du tableau de toutes les régions """
+    pyramid = _pyramids.get(("region", region))
+    if pyramid is None:
+        table = region_table(ds, ds_poids, warm_only)
+        if table is None:
+            return None
+        pyramid = _pyramids.put(("region", region), build_pyramid(table[region if region in table.columns else TOUTES_REGIONS]))
+    return pyramid
+
+
+def zoom_width(zoom):
+    """ Largeur utile transmise par ZOOM_CLIENTSIDE (pixels), DEFAULT_PIXEL_WIDTH à défaut """
+    largeur = (zoom or {}).get("largeur")
+    return int(largeur) if largeur and largeur > 0 else DEFAULT_PIXEL_WIDTH
+
+
+def relayout_range(relayout_data):
+    """
+    Lit la plage visible de l'axe x dans relayoutData.
+    Renvoie (début, fin), "auto" pour un double-clic (autorange), ou None.
+    """
+    if not relayout_data:
+        return None
+    if relayout_data.get("xaxis.autorange"):
+        return "auto"
+    if "xaxis.range[0]" in relayout_data and "xaxis.range[1]" in relayout_data:
+        return relayout_data["xaxis.range[0]"], relayout_data["xaxis.range[1]"]
+    if "xaxis.range" in relayout_data:
+        return tuple(relayout_data["xaxis.range"][:2])
+    return None
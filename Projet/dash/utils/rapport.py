@@ -0,0 +1,359 @@
+"""
+Rapports "Mode Élu" générés en lot : une page HTML statique par commune.
+
+Les résumés (réchauffement, jours chauds récents, allongement de l'été, record)
+sont calculés par bandes de communes en une passe vectorisée sur le cube
+(annual_city_stats, cf. iter_bands) ; les pages d'une bande sont rendues sur un
+pool de processus pendant le calcul de la suivante. Les rapports déjà présents (et les communes déjà marquées sans
+données) sont sautés : une génération interrompue reprend là où elle s'était arrêtée.
+
+Lancement (depuis Projet/dash) :
+    python -m utils.rapport --region "Bretagne" --seuil 30 --workers 8
+
+Depuis le serveur : POST /rapports/generer?region=Bretagne&seuil=30, puis suivi
+sur /rapports/statut/<job> (état gardé dans le cache disque partagé : lisible
+depuis n'importe quel worker) ; les pages sont servies sous /rapports/fichiers/.
+"""
+import argparse
+import os
+import re
+import threading
+import time
+import unicodedata
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from flask import Blueprint, abort, jsonify, request, send_from_directory
+from jinja2 import Environment
+
+from utils.background import BACKGROUND_CACHE
+from utils.data_loader import load_all_data
+from utils.indicators import annual_city_stats, elu_summaries, iter_bands
+from utils.regions import TOUTES_REGIONS
+
+DIR_RAPPORTS = Path(__file__).resolve().parent.parent.parent / "Donnees" / "Rapports"
+CHUNK_ROWS = 500  # communes par tâche de rendu
+SUFFIXE_VIDE = ".sans_donnees"  # marqueur des communes sans données (fenêtre en mer)
+
+rapport_bp = Blueprint("rapport", __name__)
+
+JOB_EXPIRE = 7 * 24 * 3600  # statut d'un job gardé une semaine
+JOB_STALE = 600  # job "en cours" sans nouvelles depuis 10 min : processus arrêté entre-temps
+
+
+class _MemoryStore:
+    """ Sous-ensemble de diskcache.Cache (get / set / add / delete) en mémoire, sans cache disque """
+
+    def __init__(self):
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._items.get(key, default)
+
+    def set(self, key, value, expire=None):
+        with self._lock:
+            self._items[key] = value
+        return True
+
+    def add(self, key, value, expire=None):
+        with self._lock:
+            return self._items.setdefault(key, value) is value
+
+    def delete(self, key):
+        with self._lock:
+            return self._items.pop(key, None) is not None
+
+
+# Générations lancées depuis le serveur : job -> statut, partagé entre workers
+_JOBS = BACKGROUND_CACHE if BACKGROUND_CACHE is not None else _MemoryStore()
+
+# =============================================================================
+# 1. GABARIT HTML (même contenu que la carte "Mode Élu" de la page 1)
+# =============================================================================
+
+_TEMPLATE = Environment(autoescape=True).from_string("""<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="utf-8">
+<title>Rapport climatique : {{ ville }}</title>
+<style>
+  body { font-family: system-ui, sans-serif; margin: 2rem auto; max-width: 60rem; color: #2c3e50; }
+  .entete { background: #64748B; color: white; padding: 1rem 1.5rem; border-radius: 5px 5px 0 0; letter-spacing: 1px; }
+  .corps { border: 1px solid #e2e8f0; border-top: none; padding: 1.5rem; }
+  .kpis { display: flex; text-align: center; }
+  .kpis > div { flex: 1; padding: 0 1rem; }
+  .kpis > div + div { border-left: 1px solid #e2e8f0; }
+  .kpis small { color: #6c757d; font-weight: bold; }
+  .kpis h2 { margin: .4rem 0; font-size: 2rem; }
+  .conclusion { font-size: 1.1rem; line-height: 1.5; }
+  footer { color: #6c757d; font-size: .85rem; margin-top: 1rem; }
+</style>
+</head>
+<body>
+<div class="entete"><h1 style="margin: 0; font-size: 1.5rem;">RAPPORT CLIMATIQUE : {{ ville | upper }}</h1></div>
+<div class="corps">
+  <div class="kpis">
+    <div><small>TENDANCE ({{ periode }})</small><h2 style="color: #64748B;">{{ "%+.1f" | format(delta) }}°C</h2><small>Hausse température moyenne</small></div>
+    <div><small>JOURS &gt; {{ seuil }}°C / AN</small><h2 style="color: #dc3545;">{{ jours_chauds_recent }}</h2><small>Moyenne actuelle (récente)</small></div>
+    <div><small>ALLONGEMENT ÉTÉ</small><h2 style="color: #ffc107;">{{ "%+d" | format(gain_ete) }} jours</h2><small>Jours &gt; 25°C vs {{ premiere_annee }}</small></div>
+  </div>
+  <hr>
+  <div class="conclusion">
+    <b style="color: #64748B;">CONCLUSION : </b>
+    Les données confirment une transformation majeure du climat local.
+    Le record historique de {{ "%.1f" | format(record) }}°C ({{ annee_record }}) n'est plus une anomalie isolée.
+    <b>Les infrastructures actuelles doivent être adaptées à cette nouvelle normalité.</b>
+  </div>
+</div>
+<footer>{{ region }} - rapport généré le {{ date_generation }}</footer>
+</body>
+</html>
+""")
+
+_INDEX = Environment(autoescape=True).from_string("""<!DOCTYPE html>
+<html lang="fr">
+<head><meta charset="utf-8"><title>Rapports climatiques : {{ region }}</title></head>
+<body style="font-family: system-ui, sans-serif; margin: 2rem;">
+<h1>Rapports climatiques : {{ region }} (seuil {{ seuil }}°C)</h1>
+<ul>{% for fichier, ville in rapports %}<li><a href="{{ fichier }}">{{ ville }}</a></li>{% endfor %}</ul>
+</body>
+</html>
+""")
+
+
+def _slug(text):
+    """ Nom de fichier ASCII : "Saint-Étienne" -> "saint_etienne" """
+    ascii_text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode()
+    return re.sub(r"[^A-Za-z0-9]+", "_", ascii_text).strip("_").lower()
+
+
+def report_files(communes):
+    """
+    Nom de fichier de chaque commune (Series alignée sur `communes`). Deux communes
+    qui donnent le même slug (homonymes, "Sainte-Marie" / "Sainte Marie") reçoivent
+    un suffixe _2, _3... ; l'attribution suit l'ordre (nom, lat, lon), donc reste la
+    même d'une génération à l'autre.
+    """
+    fichiers, pris = {}, set()
+    for idx, ville in communes.sort_values(["label", "lat", "lon"])["label"].items():
+        base = _slug(ville) or "commune"
+        nom, n = base, 1
+        while nom in pris:
+            n += 1
+            nom = f"{base}_{n}"
+        pris.add(nom)
+        fichiers[idx] = f"{nom}.html"
+    return pd.Series(fichiers, dtype=object).reindex(communes.index)
+
+
+def report_dir(region, seuil):
+    """ Dossier des rapports d'une région pour un seuil donné """
+    return DIR_RAPPORTS / f"{_slug(region)}_seuil{seuil:g}"
+
+
+# =============================================================================
+# 2. GÉNÉRATION
+# =============================================================================
+
+def _render_chunk(records, vides, out_dir):
+    """
+    Tâche du pool : écrit les pages d'un lot (fichier temporaire puis renommage atomique)
+    et marque les communes sans données. Renvoie le nombre de communes traitées.
+    """
+    for rec in records:
+        chemin = Path(out_dir) / rec['fichier']
+        tmp = chemin.with_suffix(".tmp")
+        tmp.write_text(_TEMPLATE.render(**rec), encoding="utf-8")
+        os.replace(tmp, chemin)
+    for fichier in vides:
+        (Path(out_dir) / fichier).with_suffix(SUFFIXE_VIDE).touch()
+    return len(records) + len(vides)
+
+
+def _write_index(out_dir, region, seuil, communes, fichiers):
+    rapports = sorted((v, f) for v, f in zip(communes['label'], fichiers) if (out_dir / f).exists())
+    rapports = [(f, v) for v, f in rapports]
+    (out_dir / "index.html").write_text(_INDEX.render(region=region, seuil=f"{seuil:g}", rapports=rapports),
+                                        encoding="utf-8")
+
+
+def generate_reports(ds, communes, region, seuil=30, workers=None, chunk_rows=CHUNK_ROWS, on_progress=None):
+    """
+    Génère un rapport HTML par commune (DataFrame label / lat / lon / Region_Assignee).
+    Les communes dont le rapport existe déjà (ou marquées sans données) sont sautées
+    (reprise). Les résumés sont calculés bande par bande (iter_bands), et les pages
+    d'une bande rendues par lots de `chunk_rows` communes pendant le calcul de la suivante.
+    on_progress(fait, total) est appelé au départ puis après chaque lot traité
+    (communes sans données comprises).
+    Renvoie un dict de bilan (total, deja_faits, generes, sans_donnees, dossier, secondes).
+    """
+    t0 = time.perf_counter()
+    out_dir = report_dir(region, seuil)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    # Doublons exacts seulement : les homonymes (positions différentes) ont chacun leur rapport
+    communes = communes.drop_duplicates(subset=["label", "lat", "lon"])
+    fichiers = report_files(communes)
+    deja_faits = fichiers.map(lambda f: (out_dir / f).exists()
+                              or (out_dir / f).with_suffix(SUFFIXE_VIDE).exists()).values
+    todo = communes[~deja_faits]
+    total = len(todo)
+    print(f">> [Rapports] {len(communes)} communes, {int(deja_faits.sum())} déjà générées, {total} à faire -> {out_dir}")
+
+    annees = ds['time'].dt.year.values
+    commun = {'region': region, 'seuil': f"{seuil:g}", 'date_generation': date.today().strftime('%d/%m/%Y'),
+              'periode': f"{annees.min()}-{annees.max()}", 'premiere_annee': int(annees.min())}
+
+    progres = {'fait': 0}
+    lock = threading.Lock()
+
+    def lot_termine(future):
+        with lock:
+            progres['fait'] += future.result()
+            fait = progres['fait']
+        print(f">> [Rapports] {fait}/{total} - {time.perf_counter() - t0:.0f}s écoulées")
+        if on_progress is not None:
+            on_progress(fait, total)
+
+    if on_progress is not None:
+        on_progress(0, total)
+
+    sans_donnees = 0
+    if total:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = []
+            # Une bande calculée = ses pages soumises au pool, qui les rend pendant la bande suivante
+            for bande in iter_bands(ds, todo):
+                st = annual_city_stats(ds, bande['lat'].values, bande['lon'].values, seuil)
+                resume = elu_summaries(st['mean'], st['hot'], st['summer'], st['record'], st['record_date'])
+                resume['ville'] = bande['label'].values
+                resume['fichier'] = fichiers.loc[bande.index].values
+
+                for start in range(0, len(resume), chunk_rows):
+                    lot = resume.iloc[start:start + chunk_rows]
+
+                    # Communes sans aucune donnée (fenêtre en mer) : pas de rapport, un marqueur
+                    valides = ~np.isnan(lot['record'].values)
+                    sans_donnees += int((~valides).sum())
+                    records = [dict(commun, **rec) for rec in lot[valides].astype({'annee_record': int}).to_dict('records')]
+                    future = pool.submit(_render_chunk, records, list(lot['fichier'].values[~valides]), str(out_dir))
+                    future.add_done_callback(lot_termine)
+                    futures.append(future)
+            for future in futures:
+                future.result()  # remonte les erreurs de rendu
+
+    _write_index(out_dir, region, seuil, communes, fichiers)
+    bilan = {'total': len(communes), 'deja_faits': int(deja_faits.sum()), 'generes': total - sans_donnees,
+             'sans_donnees': sans_donnees, 'dossier': str(out_dir), 'secondes': round(time.perf_counter() - t0, 1)}
+    print(f">> [Rapports] Terminé : {bilan}")
+    return bilan
+
+
+def select_communes(df_villes, region):
+    """ Communes d'une région (toutes pour TOUTES_REGIONS) """
+    return df_villes if region == TOUTES_REGIONS else df_villes[df_villes["Region_Assignee"] == region]
+
+
+# =============================================================================
+# 3. ROUTES FLASK
+# =============================================================================
+
+def _job_status(job_id):
+    """ Statut d'un job (None si inconnu) ; "interrompu" si le processus qui le portait s'est arrêté """
+    statut = _JOBS.get(("rapport-job", job_id))
+    if statut is not None and statut['etat'] == "en cours" and time.time() - statut['maj'] > JOB_STALE:
+        statut = dict(statut, etat="interrompu")
+    return statut
+
+
+def _update_job(job_id, **changes):
+    # Un seul thread écrit le statut d'un job : lecture puis écriture suffisent
+    statut = dict(_JOBS.get(("rapport-job", job_id)) or {}, **changes, maj=time.time())
+    _JOBS.set(("rapport-job", job_id), statut, expire=JOB_EXPIRE)
+
+
+def _run_job(job_id, ds, communes, region, seuil):
+    def on_progress(fait, total):
+        _update_job(job_id, fait=fait, total=total)
+
+    try:
+        bilan = generate_reports(ds, communes, region, seuil, on_progress=on_progress)
+    except Exception as e:
+        print(f">> [Rapports] Erreur : {e}")
+        _update_job(job_id, etat="erreur", message=str(e))
+    else:
+        _update_job(job_id, etat="terminé", bilan=bilan)
+    finally:
+        _JOBS.delete(("rapport-en-cours", region, seuil))
+
+
+@rapport_bp.route("/rapports/generer", methods=["POST"])
+def start_generation():
+    """
+    Lance la génération des rapports d'une région en arrière-plan.
+    Paramètres : region (défaut : toutes), seuil. Renvoie l'identifiant du job (202).
+    Une génération déjà en cours pour la même région et le même seuil (dans n'importe
+    quel worker) est réutilisée.
+    """
+    ds, _, df_villes = load_all_data()
+    region = request.values.get("region", TOUTES_REGIONS)
+    seuil = request.values.get("seuil", 30, type=float)
+
+    communes = select_communes(df_villes, region)
+    if communes.empty:
+        abort(404, description=f"Aucune commune pour la région {region}")
+
+    # add est atomique : un seul worker réserve la génération (région, seuil)
+    job_id = uuid.uuid4().hex
+    en_cours = ("rapport-en-cours", region, seuil)
+    _update_job(job_id, etat="en cours", region=region, seuil=seuil, fait=0, total=None)
+    if not _JOBS.add(en_cours, job_id, expire=JOB_EXPIRE):
+        existant = _JOBS.get(en_cours)
+        statut = _job_status(existant) if existant else None
+        if statut is not None and statut['etat'] == "en cours":
+            _JOBS.delete(("rapport-job", job_id))
+            return jsonify(job=existant, statut=f"/rapports/statut/{existant}"), 202
+        # Réservation laissée par un job interrompu : reprise par ce job
+        _JOBS.set(en_cours, job_id, expire=JOB_EXPIRE)
+
+    threading.Thread(target=_run_job, args=(job_id, ds, communes, region, seuil), daemon=True).start()
+    return jsonify(job=job_id, statut=f"/rapports/statut/{job_id}"), 202
+
+
+@rapport_bp.route("/rapports/statut/<job_id>")
+def generation_status(job_id):
+    """ Avancement d'une génération : etat, fait / total, bilan une fois terminée """
+    statut = _job_status(job_id)
+    if statut is None:
+        abort(404, description=f"Job inconnu : {job_id}")
+    statut = dict(statut)
+    if statut['etat'] == "terminé":
+        statut['index'] = f"/rapports/fichiers/{Path(statut['bilan']['dossier']).name}/index.html"
+    return jsonify(statut)
+
+
+@rapport_bp.route("/rapports/fichiers/<path:chemin>")
+def report_file(chemin):
+    """ Rapports générés (pages statiques) """
+    return send_from_directory(DIR_RAPPORTS, chemin)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Rapports Mode Élu pour toutes les communes d'une région")
+    parser.add_argument("--region", default=TOUTES_REGIONS, help="Région (défaut : toutes)")
+    parser.add_argument("--seuil", type=float, default=30, help="Seuil de chaleur en °C")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processus de rendu en parallèle")
+    parser.add_argument("--lot", type=int, default=CHUNK_ROWS, help="Communes par lot")
+    args = parser.parse_args()
+
+    ds, _, df_villes = load_all_data()
+    communes = select_communes(df_villes, args.region)
+    if communes.empty:
+        raise SystemExit(f"[ERREUR] Aucune commune pour la région {args.region}")
+    generate_reports(ds, communes, args.region, args.seuil, args.workers, max(args.lot, 1))
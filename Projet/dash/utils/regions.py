@@ -0,0 +1,68 @@
+import time
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+from scipy import sparse
+
+TOUTES_REGIONS = "Toutes les regions"
+
+
+def build_region_matrix(weights):
+    """
+    Convertit les poids denses (region, lat, lon) en matrice creuse région × cellule.
+    Chaque région ne couvre qu'une petite partie de la grille : la matrice CSR ne
+    stocke que les cellules non nulles. Renvoie (matrice, somme des poids par région).
+    """
+    dense = np.nan_to_num(weights.transpose('region', 'lat', 'lon').values.astype(np.float64))
+    matrix = sparse.csr_matrix(dense.reshape(dense.shape[0], -1))
+    return matrix, np.asarray(matrix.sum(axis=1)).ravel()
+
+
+def compute_region_series(ds, ds_poids, days_per_chunk=1825):
+    """
+    Séries journalières de TOUTES les régions en une seule passe sur le cube.
+
+    Le cube aplati (temps × cellules) est multiplié par la matrice creuse des poids,
+    par tranches de `days_per_chunk` jours pour borner la mémoire. Même résultat que
+    (temp * poids).sum() / poids.sum() région par région (NaN ignorés), mais une
+    passe au lieu de N. La colonne "Toutes les regions" est la moyenne simple de la grille.
+
+    Renvoie un DataFrame (index : time, colonnes : régions).
+    """
+    t0 = time.perf_counter()
+    temp = ds['temp_c'].transpose('time', 'lat', 'lon')
+    times = pd.DatetimeIndex(temp['time'].values)
+
+    if 'weights' in ds_poids:
+        # Alignement sur les cellules communes (comme la multiplication xarray) ; les
+        # cellules des poids sont repérées par indice dans le cube, lu une seule fois
+        _, weights = xr.align(temp, ds_poids['weights'], join='inner')
+        matrix, norm = build_region_matrix(weights)
+        regions = [str(r) for r in weights['region'].values]
+        lat_idx = temp.get_index('lat').get_indexer(weights['lat'].values)
+        lon_idx = temp.get_index('lon').get_indexer(weights['lon'].values)
+        same_grid = (np.array_equal(lat_idx, np.arange(temp.sizes['lat']))
+                     and np.array_equal(lon_idx, np.arange(temp.sizes['lon'])))
+    else:
+        matrix, norm, regions = None, None, []
+
+    out = np.full((len(times), len(regions) + 1), np.nan)
+
+    for start in range(0, len(times), days_per_chunk):
+        sl = slice(start, start + days_per_chunk)
+        block = np.asarray(temp.isel(time=sl).values, dtype=np.float64)
+        flat = block.reshape(block.shape[0], -1)
+        valid = ~np.isnan(flat)
+        nb = valid.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out[sl, 0] = np.where(nb > 0, np.where(valid, flat, 0.0).sum(axis=1) / nb, np.nan)
+
+        if matrix is not None:
+            # Même grille (cas courant) : le bloc déjà lu sert tel quel
+            flat_w = flat if same_grid else block[:, lat_idx[:, None], lon_idx].reshape(flat.shape[0], -1)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                out[sl, 1:] = (matrix @ np.nan_to_num(flat_w).T).T / norm
+
+    print(f">> [Regions] {len(regions)} séries régionales calculées en {time.perf_counter() - t0:.1f}s")
+    return pd.DataFrame(out, index=pd.Index(times, name='time'), columns=[TOUTES_REGIONS] + regions)
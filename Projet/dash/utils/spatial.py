@@ -0,0 +1,274 @@
+"""
+Affectation des villes aux régions (point dans polygone) à partir de DonneesRegion/region.shp.
+
+Tout est fait dans le projet, sans service ni bibliothèque géographique :
+  - lecture du shapefile (.shp polygones + .dbf attributs + .prj projection)
+  - projection des lat/lon en Lambert conique conforme (Lambert-93) si le .prj l'indique
+  - index spatial par bandes horizontales : chaque point ne teste que les arêtes
+    qui traversent sa bande, avec un lancer de rayon vectorisé NumPy
+
+Lancement (depuis Projet/dash) :
+    python -m utils.spatial --villes --poids
+
+--villes : recalcule Region_Assignee dans villes_avec_regions.parquet
+--poids  : régénère le fichier des poids lu par l'application (data_loader.weights_path :
+           weights_bool_precise.nc, ou à défaut poids_regions_finie.nc ; cellule dans la région = 1)
+"""
+import argparse
+import os
+import re
+import struct
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DIR_REGION = Path(__file__).resolve().parent.parent.parent / "Donnees" / "DonneesRegion"
+CHEMIN_SHP = DIR_REGION / "region.shp"
+CHAMP_NOM = "nom_offici"  # nom_officiel tronqué à 10 caractères par le format dBase
+
+# Nombre maximal d'éléments (points × arêtes) testés d'un coup
+_MAX_TESTS = 4_000_000
+
+
+# =============================================================================
+# 1. LECTURE DU SHAPEFILE
+# =============================================================================
+
+def read_polygons(path):
+    """ Anneaux (tableaux N×2) de chaque enregistrement polygone du .shp """
+    data = Path(path).read_bytes()
+    shapes, pos = [], 100  # en-tête fixe de 100 octets
+    while pos < len(data):
+        _, length = struct.unpack(">2i", data[pos:pos + 8])
+        content = data[pos + 8:pos + 8 + 2 * length]  # longueur en mots de 16 bits
+        pos += 8 + 2 * length
+
+        shape_type = struct.unpack("<i", content[:4])[0]
+        if shape_type not in (5, 15, 25):  # Polygon, PolygonZ, PolygonM
+            shapes.append([])
+            continue
+        n_parts, n_points = struct.unpack("<2i", content[36:44])
+        parts = np.frombuffer(content, dtype="<i4", count=n_parts, offset=44)
+        points = np.frombuffer(content, dtype="<f8", count=2 * n_points, offset=44 + 4 * n_parts).reshape(-1, 2)
+        bounds = list(parts) + [n_points]
+        shapes.append([points[bounds[k]:bounds[k + 1]] for k in range(n_parts)])
+    return shapes
+
+
+def read_dbf(path, encoding="utf-8"):
+    """ Table attributaire (.dbf) sous forme de DataFrame de chaînes """
+    data = Path(path).read_bytes()
+    n_records, header_len, record_len = struct.unpack("<IHH", data[4:12])
+
+    fields, pos = [], 32
+    while data[pos] != 0x0D:
+        name = data[pos:pos + 11].split(b"\x00")[0].decode("ascii")
+        fields.append((name, data[pos + 16]))
+        pos += 32
+
+    rows = []
+    for k in range(n_records):
+        record = data[header_len + k * record_len:header_len + (k + 1) * record_len]
+        if record[:1] == b"*":  # enregistrement supprimé
+            continue
+        offset, row = 1, {}
+        for name, size in fields:
+            row[name] = record[offset:offset + size].decode(encoding, errors="replace").strip()
+            offset += size
+        rows.append(row)
+    return pd.DataFrame(rows, columns=[name for name, _ in fields])
+
+
+def _projection(prj_text):
+    """
+    Fonction (lon, lat en degrés) -> (x, y) dans le système du .prj.
+    Lambert conique conforme 2 parallèles (Lambert-93...) d'après les paramètres
+    du .prj ; sinon coordonnées géographiques (identité).
+    """
+    if "Lambert_Conformal_Conic" not in prj_text:
+        return lambda lon, lat: (np.asarray(lon, dtype=float), np.asarray(lat, dtype=float))
+
+    def param(name):
+        return float(re.search(rf'PARAMETER\["{name}",([-\d.eE+]+)\]', prj_text, re.IGNORECASE).group(1))
+
+    a, inv_f = map(float, re.search(r'SPHEROID\["[^"]*",([\d.]+),([\d.]+)\]', prj_text).groups())
+    f = 1 / inv_f
+    e = np.sqrt(2 * f - f * f)
+    phi1, phi2, phi0 = np.radians([param("Standard_Parallel_1"), param("Standard_Parallel_2"), param("Latitude_Of_Origin")])
+    lam0 = np.radians(param("Central_Meridian"))
+    fe, fn = param("False_Easting"), param("False_Northing")
+
+    def m(phi):
+        return np.cos(phi) / np.sqrt(1 - (e * np.sin(phi)) ** 2)
+
+    def t(phi):
+        return np.tan(np.pi / 4 - phi / 2) / ((1 - e * np.sin(phi)) / (1 + e * np.sin(phi))) ** (e / 2)
+
+    n = (np.log(m(phi1)) - np.log(m(phi2))) / (np.log(t(phi1)) - np.log(t(phi2)))
+    big_f = m(phi1) / (n * t(phi1) ** n)
+    rho0 = a * big_f * t(phi0) ** n
+
+    def project(lon, lat):
+        rho = a * big_f * t(np.radians(np.asarray(lat, dtype=float))) ** n
+        theta = n * (np.radians(np.asarray(lon, dtype=float)) - lam0)
+        return fe + rho * np.sin(theta), fn + rho0 - rho * np.cos(theta)
+
+    return project
+
+
+def load_regions(shp_path=CHEMIN_SHP):
+    """ (noms des régions, polygones, fonction de projection lon/lat -> système du shapefile) """
+    shp_path = Path(shp_path)
+    cpg = shp_path.with_suffix(".cpg")
+    encoding = cpg.read_text().strip() if cpg.exists() else "latin-1"
+    attributes = read_dbf(shp_path.with_suffix(".dbf"), encoding)
+    prj = shp_path.with_suffix(".prj")
+    project = _projection(prj.read_text() if prj.exists() else "")
+    return list(attributes[CHAMP_NOM]), read_polygons(shp_path), project
+
+
+# =============================================================================
+# 2. INDEX SPATIAL + LANCER DE RAYON VECTORISÉ
+# =============================================================================
+
+class PolygonIndex:
+    """
+    Index de polygones par bandes horizontales.
+
+    Un rayon horizontal issu d'un point ne peut croiser que les arêtes dont
+    l'étendue en y contient le y du point : chaque arête est rangée dans les
+    bandes qu'elle couvre, et chaque point n'est testé que contre les arêtes de
+    sa bande. Le test (parité du nombre de croisements, trous compris) est
+    vectorisé sur tous les points et toutes les arêtes de la bande.
+    """
+
+    def __init__(self, polygons, n_bands=1024):
+        x0, y0, x1, y1, owner = [], [], [], [], []
+        for k, rings in enumerate(polygons):
+            for ring in rings:
+                nxt = np.roll(ring, -1, axis=0)  # ferme l'anneau
+                x0.append(ring[:, 0]); y0.append(ring[:, 1])
+                x1.append(nxt[:, 0]); y1.append(nxt[:, 1])
+                owner.append(np.full(len(ring), k))
+        self.n_polygons = len(polygons)
+        if not owner:
+            self.n_bands = 0
+            return
+
+        x0, y0, x1, y1, owner = map(np.concatenate, (x0, y0, x1, y1, owner))
+        keep = y0 != y1  # les arêtes horizontales ne croisent jamais le rayon
+        x0, y0, x1, y1, owner = x0[keep], y0[keep], x1[keep], y1[keep], owner[keep]
+
+        self.y_min = min(y0.min(), y1.min())
+        self.band_height = (max(y0.max(), y1.max()) - self.y_min) / n_bands or 1.0
+        self.n_bands = n_bands
+
+        # Chaque arête est dupliquée dans toutes les bandes qu'elle couvre, puis triée par bande
+        b0 = self._band(np.minimum(y0, y1))
+        b1 = self._band(np.maximum(y0, y1))
+        span = b1 - b0 + 1
+        edge = np.repeat(np.arange(len(y0)), span)
+        band = np.repeat(b0, span) + (np.arange(span.sum()) - np.repeat(np.cumsum(span) - span, span))
+        order = np.argsort(band, kind="stable")
+        self._edge = edge[order]
+        self._band_start = np.searchsorted(band[order], np.arange(n_bands + 1))
+        self._x0, self._y0, self._x1, self._y1, self._owner = x0, y0, x1, y1, owner
+
+    def _band(self, y):
+        return np.clip(((y - self.y_min) / self.band_height).astype(np.int64), 0, self.n_bands - 1)
+
+    def locate(self, x, y):
+        """ Indice du polygone contenant chaque point (x, y), -1 si aucun """
+        x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+        result = np.full(len(x), -1, dtype=np.int64)
+        if not self.n_bands or not len(x):
+            return result
+
+        band = self._band(y)
+        order = np.argsort(band, kind="stable")
+        starts = np.searchsorted(band[order], np.arange(self.n_bands + 1))
+
+        for b in np.flatnonzero(np.diff(starts)):
+            edges = self._edge[self._band_start[b]:self._band_start[b + 1]]
+            if not len(edges):
+                continue
+            ex0, ey0, ex1, ey1 = self._x0[edges], self._y0[edges], self._x1[edges], self._y1[edges]
+            # Matrice arête -> polygone (pour compter les croisements par polygone)
+            owner = np.zeros((len(edges), self.n_polygons))
+            owner[np.arange(len(edges)), self._owner[edges]] = 1
+
+            pts = order[starts[b]:starts[b + 1]]
+            step = max(1, _MAX_TESTS // len(edges))
+            for s in range(0, len(pts), step):
+                p = pts[s:s + step]
+                py, px = y[p][:, None], x[p][:, None]
+                straddle = (ey0 > py) != (ey1 > py)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    x_cross = ex0 + (py - ey0) * (ex1 - ex0) / (ey1 - ey0)
+                crossings = (straddle & (px < x_cross)) @ owner
+                inside = crossings % 2 == 1
+                result[p] = np.where(inside.any(axis=1), inside.argmax(axis=1), -1)
+        return result
+
+
+# =============================================================================
+# 3. AFFECTATION DES VILLES ET POIDS DE GRILLE
+# =============================================================================
+
+def assign_regions(lats, lons, shp_path=CHEMIN_SHP):
+    """ Nom de la région contenant chaque point (NaN hors de toute région) """
+    names, polygons, project = load_regions(shp_path)
+    x, y = project(lons, lats)
+    idx = PolygonIndex(polygons).locate(x, y)
+    return pd.Series(np.where(idx >= 0, np.array(names, dtype=object)[np.maximum(idx, 0)], None), dtype=object)
+
+
+def region_weights(lat, lon, shp_path=CHEMIN_SHP):
+    """
+    Poids de grille (region, lat, lon) : 1 si le centre de la cellule est dans la
+    région, 0 sinon. Même format que les fichiers de poids (data_loader.weights_path).
+    """
+    import xarray as xr
+
+    names, polygons, project = load_regions(shp_path)
+    grid_lon, grid_lat = np.meshgrid(np.asarray(lon), np.asarray(lat))
+    x, y = project(grid_lon.ravel(), grid_lat.ravel())
+    idx = PolygonIndex(polygons).locate(x, y).reshape(grid_lat.shape)
+
+    weights = np.stack([(idx == k).astype(np.float32) for k in range(len(names))])
+    return xr.Dataset(
+        {'weights': (('region', 'lat', 'lon'), weights)},
+        coords={'region': names, 'lat': np.asarray(lat), 'lon': np.asarray(lon)},
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Affectation des villes et poids de grille depuis region.shp")
+    parser.add_argument("--villes", action="store_true", help="Recalcule Region_Assignee dans villes_avec_regions.parquet")
+    parser.add_argument("--poids", action="store_true", help="Régénère les poids régionaux (data_loader.weights_path) sur la grille météo")
+    args = parser.parse_args()
+
+    if not CHEMIN_SHP.exists():
+        raise SystemExit(f"[ERREUR] Shapefile introuvable : {CHEMIN_SHP}")
+
+    from utils.data_loader import load_all_data, weights_path
+    ds, _, df_villes = load_all_data()
+
+    if args.villes:
+        t0 = time.perf_counter()
+        df_villes = df_villes.copy()
+        df_villes["Region_Assignee"] = assign_regions(df_villes["lat"].values, df_villes["lon"].values).fillna("Hors Region").values
+        chemin = DIR_REGION.parent / "DonneesVilles" / "villes_avec_regions.parquet"
+        df_villes.to_parquet(chemin, index=False)
+        print(f">> [Spatial] {len(df_villes)} villes affectées en {time.perf_counter() - t0:.1f}s -> {chemin}")
+
+    if args.poids:
+        t0 = time.perf_counter()
+        # Le fichier lu au chargement (ouvert par load_all_data) : écrit à côté puis remplacé
+        chemin = weights_path()
+        tmp = chemin.with_suffix(".tmp")
+        region_weights(ds['lat'].values, ds['lon'].values).to_netcdf(tmp)
+        os.replace(tmp, chemin)
+        print(f">> [Spatial] Poids de grille écrits en {time.perf_counter() - t0:.1f}s -> {chemin}")
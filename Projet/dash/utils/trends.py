@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from utils.extraction import get_executor
+
+# Lignes traitées par tâche : borne la matrice des paires (lignes × paires d'années)
+CHUNK_ROWS = 500
+
+
+def ols_trend(values, x, alpha=0.05):
+    """
+    Régression linéaire (moindres carrés) de chaque ligne de `values` sur x.
+    values : (n_series, n_annees), NaN ignorés ligne par ligne.
+    Renvoie un dict de tableaux (n_series,) : slope, intercept, stderr,
+    ci_low / ci_high (intervalle de confiance 1 - alpha), p_value, n.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    x = np.asarray(x, dtype=np.float64)
+    mask = ~np.isnan(values)
+    n = mask.sum(axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x_mean = np.where(mask, x, 0.0).sum(axis=1) / n
+        y_mean = np.where(mask, values, 0.0).sum(axis=1) / n
+        dx = np.where(mask, x - x_mean[:, None], 0.0)
+        dy = np.where(mask, values - y_mean[:, None], 0.0)
+        sxx = (dx ** 2).sum(axis=1)
+        slope = (dx * dy).sum(axis=1) / sxx
+        sse = ((dy - slope[:, None] * dx) ** 2).sum(axis=1)
+        dof = np.maximum(n - 2, 1)
+        stderr = np.sqrt(sse / dof / sxx)
+        t_crit = stats.t.ppf(1 - alpha / 2, dof)
+        p_value = 2 * stats.t.sf(np.abs(slope / stderr), dof)
+
+    intercept = y_mean - slope * x_mean
+    invalid = n < 3
+    for arr in (slope, intercept, stderr, p_value):
+        arr[invalid] = np.nan
+
+    return {
+        'slope': slope,
+        'intercept': intercept,
+        'stderr': stderr,
+        'ci_low': slope - t_crit * stderr,
+        'ci_high': slope + t_crit * stderr,
+        'p_value': p_value,
+        'n': n,
+    }
+
+
+def _tie_correction(values):
+    """ Somme des t(t-1)(2t+5) sur les groupes d'ex-aequo de chaque ligne (variance de Mann-Kendall) """
+    ordered = np.sort(values, axis=1)  # NaN en fin de ligne
+    same = ordered[:, 1:] == ordered[:, :-1]
+    padded = np.zeros((same.shape[0], same.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = same
+    edges = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    t = (ends - starts + 1).astype(np.float64)
+    correction = np.zeros(values.shape[0])
+    np.add.at(correction, rows, t * (t - 1) * (2 * t + 5))
+    return correction
+
+
+def mann_kendall_sen(values, x):
+    """
+    Test de Mann-Kendall et pente de Sen, vectorisés sur toutes les lignes.
+    Toutes les paires d'années (i < j) sont évaluées d'un coup : matrice
+    (n_series, n_paires), à découper en lots pour les grandes grilles.
+    Renvoie un dict : s, z, p_value, sen_slope (n_series,).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    x = np.asarray(x, dtype=np.float64)
+    i, j = np.triu_indices(values.shape[1], k=1)
+
+    diff = values[:, j] - values[:, i]
+    valid = ~np.isnan(diff)
+    s = np.sign(np.where(valid, diff, 0.0)).sum(axis=1)
+
+    n = (~np.isnan(values)).sum(axis=1).astype(np.float64)
+    var_s = (n * (n - 1) * (2 * n + 5) - _tie_correction(values)) / 18
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z = np.where(s > 0, s - 1, np.where(s < 0, s + 1, 0.0)) / np.sqrt(var_s)
+        sen = np.where(valid, diff / (x[j] - x[i]), np.nan)
+    z[n < 3] = np.nan
+
+    # nanmedian : pas d'avertissement pour les lignes sans aucune paire valide
+    sen_slope = np.full(values.shape[0], np.nan)
+    has_pairs = valid.any(axis=1)
+    sen_slope[has_pairs] = np.nanmedian(sen[has_pairs], axis=1)
+
+    return {'s': s, 'z': z, 'p_value': 2 * stats.norm.sf(np.abs(z)), 'sen_slope': sen_slope}
+
+
+def _trend_chunk(values, x, alpha):
+    ols = ols_trend(values, x, alpha)
+    mk = mann_kendall_sen(values, x)
+    return pd.DataFrame({
+        'pente_ols': ols['slope'],
+        'ic_bas': ols['ci_low'],
+        'ic_haut': ols['ci_high'],
+        'p_ols': ols['p_value'],
+        'mk_s': mk['s'],
+        'mk_z': mk['z'],
+        'p_mk': mk['p_value'],
+        'pente_sen': mk['sen_slope'],
+        'n_annees': ols['n'],
+    })
+
+
+def trend_table(annual, alpha=0.05, executor=None, chunk_rows=CHUNK_ROWS):
+    """
+    Statistiques de tendance pour une matrice de séries annuelles.
+
+    annual : DataFrame (lignes = séries : villes, cellules, pays... ; colonnes = années)
+    Les lignes sont découpées en lots de `chunk_rows`, traités en parallèle sur
+    l'executor (pool de threads partagé par défaut : NumPy relâche le GIL ; un
+    ProcessPoolExecutor convient aussi, les fonctions étant picklables).
+    Pentes en °C par an. Renvoie un DataFrame indexé comme `annual`.
+    """
+    values = annual.to_numpy(dtype=np.float64)
+    x = np.asarray(annual.columns, dtype=np.float64)
+
+    if len(values) <= chunk_rows:
+        table = _trend_chunk(values, x, alpha)
+    else:
+        chunks = [values[k:k + chunk_rows] for k in range(0, len(values), chunk_rows)]
+        parts = (executor or get_executor()).map(_trend_chunk, chunks, [x] * len(chunks), [alpha] * len(chunks))
+        table = pd.concat(list(parts), ignore_index=True)
+
+    table.index = annual.index
+    return table